@@ -0,0 +1,4 @@
+"""AWS Reserved Instance inventory tool"""
+from aws_ri_inventory.cli import main
+
+__all__ = ["main"]
@@ -0,0 +1,3 @@
+from aws_ri_inventory.cli import main
+
+raise SystemExit(main())
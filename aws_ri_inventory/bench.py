@@ -0,0 +1,476 @@
+"""Benchmark of every pipeline stage against synthetic RI fleets.
+
+A fleet of synthetic Reserved Instances, marketplace listings and Cost
+Explorer utilization groups is generated for each size and served to real
+boto3 clients from botocore's before-call event, the hook Stubber answers
+from, with an optional per-call latency. The fetch stages run the
+application's own get_inventory against a temporary snapshot store, and the
+table stages the results window's own search, filter and sort code. Each
+stage (fetch, refetch, reload, merge, populate, filter, sort, rollup, tree,
+export) is timed on that data and the results are returned as a JSON-ready
+dict with throughput and peak traced memory per stage. Memory is traced in a separate run of each stage,
+since tracemalloc slows the pure Python stages down several times.
+"""
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+import functools as ft
+import gc
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+import boto3
+import numpy as np
+import pandas as pd
+from botocore.awsrequest import AWSResponse
+from botocore.stub import Stubber
+
+from aws_ri_inventory import inventory
+from aws_ri_inventory.diff import diff_inventory
+from aws_ri_inventory.export import export_frame
+from aws_ri_inventory.rollups import ROLLUPS, RollupEngine
+from aws_ri_inventory.table import (
+    build_search_index,
+    column_sort_order,
+    refine_search,
+    sort_positions,
+    state_positions,
+    stringify_rows,
+    value_masks,
+)
+
+BENCH_SIZES = (1000, 10000, 100000, 1000000)
+BENCH_REGIONS = ("ap-northeast-1", "ca-central-1", "eu-west-1", "us-east-1", "us-west-2")
+BENCH_ACCOUNT_ID = "111111111111"
+
+# Synthetic dates are relative to this instant, so every run merges the same data
+SYNTHETIC_NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# Share of RIs that were listed on the marketplace, and of those, listed again
+LISTED_SHARE = 0.1
+RELISTED_SHARE = 0.2
+
+# Groups per synthetic Cost Explorer response page
+UTILIZATION_PAGE_SIZE = 5000
+
+INSTANCE_TYPES = (
+    "c5.large", "c5.xlarge", "c6i.2xlarge", "m5.large", "m5.xlarge", "m5.2xlarge",
+    "m6i.large", "r5.large", "r5.4xlarge", "r6g.xlarge", "t3.medium", "t3.large",
+)
+RI_STATES = ("active", "active", "active", "retired", "payment-pending")
+LISTING_STATUSES = ("active", "closed", "cancelled")
+
+# The search box input replayed one keystroke at a time by the filter stage
+FILTER_QUERY = "m5.xlarge"
+FILTER_STATE = "active"
+
+# Share of the RIs a refresh changes in the rollup update stage
+REFRESH_SHARE = 0.01
+
+# Visible rows of the results table, as in its default window
+TREE_PAGE_SIZE = 28
+TREE_SCROLL_STEPS = 100
+
+def synthetic_fleet(count, regions=None, seed=0):
+    """Return raw API records for count RIs spread over regions.
+
+    The result holds {region: [RI records]} under "ris", {region: [listing
+    records]} under "listings" and the Cost Explorer groups of every RI that
+    is not retired under "utilization", shaped like the boto3 responses.
+    """
+    if regions is None:
+        regions = BENCH_REGIONS
+    rng = random.Random(seed)
+
+    ris = {region: [] for region in regions}
+    listings = {region: [] for region in regions}
+    utilization = []
+    for i in range(count):
+        region = regions[i % len(regions)]
+        ri_id = f"{i:08x}-{rng.getrandbits(16):04x}-4{rng.getrandbits(12):03x}-8{rng.getrandbits(12):03x}-{rng.getrandbits(48):012x}"
+        duration_days = rng.choice((365, 1095))
+        start = SYNTHETIC_NOW - timedelta(days=rng.randrange(duration_days + 180), seconds=rng.randrange(86400))
+        end = start + timedelta(days=duration_days)
+        state = "retired" if end < SYNTHETIC_NOW else rng.choice(RI_STATES)
+        ris[region].append({
+            "ReservedInstancesId": ri_id,
+            "InstanceType": rng.choice(INSTANCE_TYPES),
+            "InstanceCount": rng.randint(1, 20),
+            "Start": start,
+            "End": end,
+            "Duration": duration_days * 86400,
+            "State": state,
+            "OfferingClass": "standard",
+            "OfferingType": "All Upfront",
+            "ProductDescription": "Linux/UNIX",
+            "Scope": "Region",
+        })
+
+        if rng.random() < LISTED_SHARE:
+            listing_count = 2 if rng.random() < RELISTED_SHARE else 1
+            for listing in range(listing_count):
+                created = start + timedelta(days=rng.randrange(30, 300), seconds=rng.randrange(86400))
+                status = "active" if listing == listing_count - 1 else rng.choice(LISTING_STATUSES[1:])
+                listings[region].append({
+                    "ClientToken": f"{ri_id}-{listing}",
+                    "ReservedInstancesListingId": f"{rng.getrandbits(128):032x}",
+                    "ReservedInstancesId": ri_id,
+                    "CreateDate": created,
+                    "UpdateDate": created + timedelta(days=rng.randrange(1, 60)),
+                    "Status": status,
+                    "PriceSchedules": [{"Term": rng.randint(1, 11), "Price": 100.0, "CurrencyCode": "USD", "Active": True}],
+                })
+
+        if state != "retired":
+            purchased_hours = 720.0
+            actual_hours = round(rng.uniform(0, purchased_hours), 1)
+            utilization.append({
+                "Attributes": {
+                    "reservationARN": f"arn:aws:ec2:{region}:{BENCH_ACCOUNT_ID}:reserved-instances/{ri_id}",
+                    "subscriptionStatus": "Active",
+                    "totalAssetValue": f"{rng.uniform(100, 20000):.2f}",
+                    "startDateTime": start.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                    "endDateTime": end.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                },
+                "Utilization": {
+                    "UtilizationPercentage": f"{actual_hours / purchased_hours * 100:.2f}",
+                    "PurchasedHours": f"{purchased_hours}",
+                    "TotalActualHours": f"{actual_hours}",
+                    "UnusedHours": f"{purchased_hours - actual_hours:.1f}",
+                    "NetRISavings": f"{rng.uniform(-50, 500):.2f}",
+                },
+            })
+
+    return {"ris": ris, "listings": listings, "utilization": utilization}
+
+def fleet_response(fleet, operation_name, region, params):
+    if operation_name == "DescribeReservedInstances":
+        return {"ReservedInstances": fleet["ris"].get(region, [])}
+    if operation_name == "DescribeReservedInstancesListings":
+        return {"ReservedInstancesListings": fleet["listings"].get(region, [])}
+
+    if "GroupBy" in params and "Granularity" in params:
+        return {"Error": {"Code": "ValidationException", "Message": "Granularity can't be set when GroupBy is set"}}
+
+    # Cost Explorer answers a grouped request with one total over the whole
+    # period. The fleet's usage is reported on yesterday only, so one-day
+    # requests for other days come back empty and the history holds one day per RI.
+    groups = fleet["utilization"]
+    time_period = params["TimePeriod"]
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    if not time_period["Start"] <= yesterday.isoformat() < time_period["End"]:
+        groups = []
+
+    start = int(params.get("NextPageToken") or 0)
+    end = start + UTILIZATION_PAGE_SIZE
+    response = {
+        "UtilizationsByTime": [{
+            "TimePeriod": time_period,
+            "Groups": groups[start:end],
+        }],
+    }
+    if end < len(groups):
+        response["NextPageToken"] = str(end)
+    return response
+
+def stub_aws_session(fleet, latency=0.0):
+    """Return (session, calls): a boto3 session whose RI and Cost Explorer calls are answered from fleet.
+
+    Every call still goes through boto3 parameter validation and endpoint
+    resolution, then sleeps for latency seconds instead of sending a request.
+    calls counts the answered calls by operation name. Utilization requests
+    that set both GroupBy and Granularity fail with a ValidationException, as
+    they do against Cost Explorer.
+    """
+    session = boto3.Session(
+        aws_access_key_id="bench",
+        aws_secret_access_key="bench",
+        region_name="us-east-1"
+    )
+    calls = Counter()
+    calls_lock = threading.Lock()
+
+    # before-call only sees the serialized request, so keep the call's parameters in its context
+    def keep_params(params, context, **kwargs):
+        context["bench_params"] = params
+
+    def answer(model, request_signer, context, **kwargs):
+        if latency:
+            time.sleep(latency)
+        with calls_lock:
+            calls[model.name] += 1
+        response = fleet_response(fleet, model.name, request_signer.region_name, context["bench_params"])
+        return AWSResponse(None, 400 if "Error" in response else 200, {}, None), response
+
+    for operation in (
+        "ec2.DescribeReservedInstances",
+        "ec2.DescribeReservedInstancesListings",
+        "ce.GetReservationUtilization",
+    ):
+        session.events.register(f"before-parameter-build.{operation}", keep_params)
+        session.events.register(f"before-call.{operation}", answer)
+    return session, calls
+
+def check_fleet_payloads(fleet, sample_size=10):
+    """Check a sample of every synthetic response against the service models with Stubber.
+
+    Stubber validates each response as it is added, and the calls made with
+    the stubbers active check that boto3 hands it back unchanged.
+    """
+    session = boto3.Session(aws_access_key_id="bench", aws_secret_access_key="bench", region_name="us-east-1")
+    region = next(region for region, records in fleet["ris"].items() if records)
+    ec2_client = session.client("ec2", region_name=region)
+    ce_client = session.client("ce")
+    ec2_stubber = Stubber(ec2_client)
+    ce_stubber = Stubber(ce_client)
+
+    ec2_stubber.add_response(
+        "describe_reserved_instances",
+        {"ReservedInstances": fleet["ris"][region][:sample_size]}
+    )
+    ec2_stubber.add_response(
+        "describe_reserved_instances_listings",
+        {"ReservedInstancesListings": fleet["listings"][region][:sample_size]}
+    )
+    ce_stubber.add_response(
+        "get_reservation_utilization",
+        {"UtilizationsByTime": [{"Groups": fleet["utilization"][:sample_size]}]}
+    )
+
+    with ec2_stubber, ce_stubber:
+        ris = ec2_client.describe_reserved_instances()["ReservedInstances"]
+        listings = ec2_client.describe_reserved_instances_listings()["ReservedInstancesListings"]
+        utilization = ce_client.get_reservation_utilization(
+            TimePeriod={"Start": "2025-01-01", "End": "2025-01-02"}
+        )["UtilizationsByTime"][0]["Groups"]
+    assert len(ris) == len(fleet["ris"][region][:sample_size])
+    assert len(listings) == len(fleet["listings"][region][:sample_size])
+    assert len(utilization) == len(fleet["utilization"][:sample_size])
+
+def fetch_fleet_inventory(session, regions, snapshot_path, max_workers=None):
+    """Fetch and merge the fleet with get_inventory, as for a single account, keeping snapshots at snapshot_path.
+
+    Raises RuntimeError if any source failed, so a broken stub cannot pass for a fast fetch.
+    """
+    if max_workers is None:
+        max_workers = inventory.MAX_REGION_WORKERS
+    inventory.fetch_errors.clear()
+    df_inventory = inventory.get_inventory(
+        [BENCH_ACCOUNT_ID],
+        lambda account_id: session,
+        regions=list(regions),
+        max_workers=max_workers,
+        calls_per_account=max_workers,
+        snapshot_path=snapshot_path
+    )
+    if inventory.fetch_errors:
+        raise RuntimeError(f"Benchmark fetch failed: {inventory.fetch_errors}")
+    return df_inventory
+
+def merge_fleet_snapshots(regions, snapshots):
+    """Merge the fleet's source snapshots as get_inventory does once every source is in"""
+    return inventory.merge_sources([BENCH_ACCOUNT_ID], {BENCH_ACCOUNT_ID: list(regions)}, {BENCH_ACCOUNT_ID: snapshots})
+
+def replay_filters(search_index, state_masks, order):
+    """Type FILTER_QUERY into the search box, narrowing as the results table does, then clear it.
+
+    Each step is filtered by FILTER_STATE and put in sort order like the table's apply_filters.
+    """
+    all_positions = np.arange(len(search_index))
+    search_text = ""
+    positions = all_positions
+    shown = 0
+    for length in range(len(FILTER_QUERY) + 1):
+        positions = refine_search(search_index, all_positions, search_text, positions, FILTER_QUERY[:length])
+        search_text = FILTER_QUERY[:length]
+        shown = len(sort_positions(order, state_positions(positions, state_masks, FILTER_STATE)))
+    positions = refine_search(search_index, all_positions, search_text, positions, "")
+    sort_positions(order, state_positions(positions, state_masks, FILTER_STATE))
+    return shown
+
+def read_rollups(engine):
+    """Read every rollup, as switching through them in the summary pane does"""
+    return [engine.rollup(dimensions) for dimensions in ROLLUPS]
+
+def refreshed_inventory(df, share, seed=0):
+    """Return df with the UnusedHours of share of its RIs changed, as a refresh would, and its diff from df"""
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(len(df), max(1, int(len(df) * share)), replace=False)
+    unused_hours = df["UnusedHours"].to_numpy(dtype=float, copy=True)
+    unused_hours[positions] = np.nan_to_num(unused_hours[positions]) + 1
+    df_refreshed = df.assign(UnusedHours=unused_hours)
+    return df_refreshed, diff_inventory(df, df_refreshed)
+
+def sort_every_column(df, positions):
+    """Sort by every column, ascending then descending, as clicking each header twice does"""
+    for col in df.columns:
+        order = column_sort_order(df[col])
+        sort_positions(order, positions)
+        sort_positions(order[::-1], positions)
+
+def open_tk_root():
+    """Return a hidden Tk root, or None when there is no tkinter or no display"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    return root
+
+def fill_tree(root, columns, rows, view):
+    """Show rows in a virtual Treeview, filter it to view and scroll through it"""
+    from tkinter import ttk
+    from aws_ri_inventory.gui import VirtualTreeview
+
+    tree = ttk.Treeview(root, columns=columns, show='headings')
+    scrollbar = ttk.Scrollbar(root, orient='vertical')
+    virtual_tree = VirtualTreeview(tree, scrollbar, rowheight=22)
+    virtual_tree.page_size = TREE_PAGE_SIZE
+
+    virtual_tree.set_rows(rows)
+    virtual_tree.set_view(view)
+    for step in range(TREE_SCROLL_STEPS):
+        virtual_tree.scroll_to(step * len(view) // TREE_SCROLL_STEPS)
+    root.update_idletasks()
+    tree.destroy()
+    scrollbar.destroy()
+
+def run_stage(stages, stage, records, fn, trace_memory=True):
+    """Run fn as a timed stage and record its throughput in stages.
+
+    With trace_memory, fn first runs once more under tracemalloc to record the
+    peak memory it allocates, so tracing never slows down the timed run.
+    """
+    peak_bytes = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+
+    stages[stage] = {
+        "seconds": round(seconds, 6),
+        "records": records,
+        "records_per_second": round(records / seconds, 1) if seconds else None,
+        "peak_memory_bytes": peak_bytes,
+    }
+    print(f"{records} records: {stage} {seconds:.3f}s", file=sys.stderr)
+    return result
+
+def run_benchmark(count, regions=None, latency=0.0, max_workers=None, trace_memory=True, seed=0):
+    """Generate a fleet of count RIs, run every stage on it and return the timings"""
+    if regions is None:
+        regions = BENCH_REGIONS
+
+    fleet = synthetic_fleet(count, regions, seed)
+    check_fleet_payloads(fleet)
+    payload_records = (
+        sum(len(records) for records in fleet["ris"].values())
+        + sum(len(records) for records in fleet["listings"].values())
+        + len(fleet["utilization"])
+    )
+    stages = {}
+    run = ft.partial(run_stage, stages, trace_memory=trace_memory)
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        def new_snapshot_path():
+            return os.path.join(tempfile.mkdtemp(dir=snapshot_dir), "snapshots.sqlite3")
+
+        # Each fetch starts from a new session and an empty snapshot store, so client
+        # creation, model loading and writing every snapshot are included
+        def fetch():
+            session, calls = stub_aws_session(fleet, latency)
+            snapshot_path = new_snapshot_path()
+            return fetch_fleet_inventory(session, regions, snapshot_path, max_workers), calls, session, snapshot_path
+        _, calls, session, snapshot_path = run("fetch", payload_records, fetch)
+        api_calls = dict(calls)
+
+        # A refresh in the same app session reuses the clients pooled by the first fetch
+        run("refetch", payload_records, lambda: fetch_fleet_inventory(session, regions, new_snapshot_path(), max_workers))
+        del session
+
+        # Every snapshot is still fresh, so a reload only reads and merges them
+        run("reload", payload_records, lambda: fetch_fleet_inventory(None, regions, snapshot_path, max_workers))
+        snapshots = inventory.load_snapshots(BENCH_ACCOUNT_ID, snapshot_path)
+
+    df_results = run("merge", payload_records, lambda: merge_fleet_snapshots(regions, snapshots))
+    del snapshots
+    rows = len(df_results)
+
+    # What the results window computes once before showing any row
+    def populate():
+        display_rows = stringify_rows(df_results)
+        search_index = build_search_index(display_rows)
+        state_masks = value_masks(df_results["State"])
+        return display_rows, search_index, state_masks
+    display_rows, search_index, state_masks = run("populate", rows, populate)
+    state_view = np.flatnonzero(state_masks[FILTER_STATE])
+
+    # The filters keep the first sort order, like a table sorted once by its first column
+    first_order = column_sort_order(df_results[df_results.columns[0]])
+    run("filter", rows, lambda: replay_filters(search_index, state_masks, first_order))
+    run("sort", rows, lambda: sort_every_column(df_results, state_view))
+
+    # The summary pane's rollups, then a refresh that changes REFRESH_SHARE of the RIs
+    engine = RollupEngine(df_results)
+    run("rollup", rows, lambda: read_rollups(RollupEngine(df_results)))
+    df_refreshed, df_changes = refreshed_inventory(df_results, REFRESH_SHARE, seed)
+    run("rollup update", len(df_changes), lambda: engine.update(df_refreshed, df_changes))
+    del engine, df_refreshed, df_changes
+
+    root = open_tk_root()
+    if root is None:
+        stages["tree"] = {"skipped": "no display"}
+    else:
+        try:
+            view = sort_positions(first_order, state_view)
+            run("tree", rows, lambda: fill_tree(root, list(df_results.columns), display_rows, view))
+        finally:
+            root.destroy()
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        export_path = os.path.join(export_dir, "ris.csv")
+        run("export", rows, lambda: export_frame(df_results, export_path))
+        stages["export"]["bytes"] = os.path.getsize(export_path)
+
+    return {
+        "reservations": count,
+        "rows": rows,
+        "regions": len(regions),
+        "latency_seconds": latency,
+        "api_calls": api_calls,
+        "stages": stages,
+    }
+
+def run_benchmarks(sizes=None, regions=None, latency=0.0, max_workers=None, trace_memory=True, seed=0):
+    """Run the benchmark for every fleet size. Returns the JSON-ready report."""
+    if sizes is None:
+        sizes = BENCH_SIZES
+
+    runs = []
+    for count in sizes:
+        runs.append(run_benchmark(count, regions, latency, max_workers, trace_memory, seed))
+        gc.collect()
+
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "trace_memory": trace_memory,
+        "runs": runs,
+    }
@@ -0,0 +1,214 @@
+"""Command line entry point.
+
+Only the standard library is imported up front. pandas, boto3 and tkinter
+are imported by the subcommand that needs them, so `fetch` never loads
+tkinter and `--help` returns without loading anything heavy.
+"""
+import argparse
+import sys
+import time
+
+START_TIME = time.perf_counter()
+
+def run_gui(args):
+    from aws_ri_inventory.gui import run_app
+    run_app()
+    return 0
+
+def run_fetch(args):
+    import boto3
+    from aws_ri_inventory import inventory
+    from aws_ri_inventory import tracing
+    from aws_ri_inventory.export import export_frame
+    from aws_ri_inventory.schema import DATE_FORMAT
+    startup_seconds = time.perf_counter() - START_TIME
+
+    # Credentials come from the standard boto3 chain: environment, profile, instance role...
+    session = boto3.Session(profile_name=args.profile)
+    df_inventory = inventory.fetch_inventory(
+        session,
+        account_ids=args.account_ids,
+        role_name=args.role_name,
+        regions=args.regions,
+        max_workers=args.max_workers,
+        use_snapshots=not args.no_snapshots
+    )
+
+    if args.output == "-":
+        df_inventory.to_csv(sys.stdout, index=False, date_format=DATE_FORMAT)
+    else:
+        export_frame(df_inventory, args.output)
+
+    for stage, region, error in inventory.fetch_errors:
+        print(f"{stage} error in region {region}: {error}", file=sys.stderr)
+
+    if args.trace:
+        tracing.write_trace(args.trace)
+    print(tracing.format_summary(tracing.trace_summary()), file=sys.stderr)
+
+    total_seconds = time.perf_counter() - START_TIME
+    print(
+        f"Wrote {len(df_inventory)} RIs to {args.output} "
+        f"(startup {startup_seconds:.2f}s, total {total_seconds:.2f}s)",
+        file=sys.stderr
+    )
+    return 2 if inventory.fetch_errors else 0
+
+def run_serve(args):
+    import boto3
+    from aws_ri_inventory import service
+
+    session = boto3.Session(profile_name=args.profile)
+    service.run_service(
+        session,
+        host=args.host,
+        port=args.port,
+        refresh_minutes=args.refresh_minutes,
+        use_snapshots=not args.no_snapshots,
+        account_ids=args.account_ids,
+        role_name=args.role_name,
+        regions=args.regions,
+        max_workers=args.max_workers
+    )
+    return 0
+
+def run_utilization(args):
+    from aws_ri_inventory import inventory
+    from aws_ri_inventory import utilization
+    from aws_ri_inventory.export import export_frame
+    from aws_ri_inventory.schema import DATE_FORMAT
+
+    account_ids = args.account_ids or utilization.list_history_accounts(inventory.SNAPSHOT_DB)
+    frames = []
+    for account_id in account_ids:
+        df_rollups = utilization.utilization_rollups(account_id, inventory.SNAPSHOT_DB, windows=args.windows)
+        df_rollups.insert(0, "AccountId", account_id)
+        frames.append(df_rollups)
+    df_utilization = inventory.concat_frames(frames)
+
+    if args.output == "-":
+        df_utilization.to_csv(sys.stdout, index=False, date_format=DATE_FORMAT)
+    else:
+        export_frame(df_utilization, args.output)
+    print(f"Wrote utilization rollups for {len(df_utilization)} RIs to {args.output}", file=sys.stderr)
+    return 0
+
+def run_bench(args):
+    import json
+    from aws_ri_inventory import bench
+
+    report = bench.run_benchmarks(
+        sizes=args.sizes,
+        regions=args.regions,
+        latency=args.latency_ms / 1000,
+        max_workers=args.max_workers,
+        trace_memory=not args.no_trace_memory,
+        seed=args.seed
+    )
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+def add_fetch_arguments(parser):
+    """Add the options that say what to fetch and with which credentials"""
+    parser.add_argument("--profile", help="AWS profile to use instead of the default credential chain")
+    parser.add_argument("--account-ids", nargs="+", metavar="ACCOUNT_ID",
+                        help="accounts to inventory by assuming --role-name in each")
+    parser.add_argument("--role-name", help="role to assume in every account of --account-ids")
+    parser.add_argument("--regions", nargs="+", metavar="REGION",
+                        help="regions to query instead of every enabled region")
+    parser.add_argument("--max-workers", type=int, help="size of the fetch thread pool")
+    parser.add_argument("--no-snapshots", action="store_true",
+                        help="ignore and do not update the local snapshot store")
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="aws-ri-inventory",
+        description="Inventory AWS Reserved Instances, their marketplace listings and utilization."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("gui", help="open the desktop application (the default)")
+
+    fetch_parser = subparsers.add_parser(
+        "fetch",
+        help="fetch the merged inventory and write it to a file, without a display",
+        description="Fetch the merged inventory with credentials from the standard boto3 chain "
+                    "and write it as CSV. Exits with 2 if some regions or accounts failed."
+    )
+    fetch_parser.add_argument("-o", "--output", default="ris.csv",
+                              help="file to write, as .csv, .parquet, .jsonl.gz or .jsonl.zst, "
+                                   "or - for CSV on stdout (default: ris.csv)")
+    add_fetch_arguments(fetch_parser)
+    fetch_parser.add_argument("--trace", metavar="FILE",
+                              help="write the timings of every stage and API call as a JSON trace "
+                                   "(open it in chrome://tracing or Perfetto)")
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="refresh the inventory on a schedule and serve it over a local HTTP/JSON API",
+        description="Fetch the merged inventory every --refresh-minutes with credentials from the "
+                    "standard boto3 chain and serve it on GET /inventory (with q, COLUMN=VALUE, sort, "
+                    "order, offset and limit parameters and ETags) and GET /status."
+    )
+    serve_parser.add_argument("--host", help="address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, help="port to listen on (default: 8642)")
+    serve_parser.add_argument("--refresh-minutes", type=float, help="minutes between refreshes (default: 60)")
+    add_fetch_arguments(serve_parser)
+
+    utilization_parser = subparsers.add_parser(
+        "utilization",
+        help="write utilization rollups from the local daily history, without calling AWS",
+        description="Compute utilization, unused hours and net savings per RI over each window "
+                    "from the daily history stored by previous fetches."
+    )
+    utilization_parser.add_argument("-o", "--output", default="-",
+                                    help="file to write, as .csv, .parquet, .jsonl.gz or .jsonl.zst, "
+                                         "or - for CSV on stdout (default: -)")
+    utilization_parser.add_argument("--account-ids", nargs="+", metavar="ACCOUNT_ID",
+                                    help="accounts to report on (default: every account in the history)")
+    utilization_parser.add_argument("--windows", nargs="+", type=int, metavar="DAYS",
+                                    help="rollup windows in days (default: 7 30 90 365)")
+
+    bench_parser = subparsers.add_parser(
+        "bench",
+        help="time every stage against synthetic RI fleets, without calling AWS",
+        description="Generate synthetic RI, listing and utilization responses for each fleet size, "
+                    "serve them to stubbed boto3 clients and report the time, throughput and peak "
+                    "memory of every stage as JSON."
+    )
+    bench_parser.add_argument("-o", "--output", default="-",
+                              help="JSON file to write, or - for stdout (default: -)")
+    bench_parser.add_argument("--sizes", nargs="+", type=int, metavar="COUNT",
+                              help="fleet sizes in RIs (default: 1000 10000 100000 1000000)")
+    bench_parser.add_argument("--regions", nargs="+", metavar="REGION",
+                              help="regions to spread each fleet over (default: 5 regions)")
+    bench_parser.add_argument("--latency-ms", type=float, default=0,
+                              help="simulated latency of every AWS call (default: 0)")
+    bench_parser.add_argument("--max-workers", type=int, help="size of the fetch thread pool")
+    bench_parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic fleets (default: 0)")
+    bench_parser.add_argument("--no-trace-memory", action="store_true",
+                              help="do not run every stage a second time to trace its peak memory")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "fetch":
+        if args.account_ids and not args.role_name:
+            parser.error("--account-ids requires --role-name")
+        return run_fetch(args)
+    if args.command == "serve":
+        if args.account_ids and not args.role_name:
+            parser.error("--account-ids requires --role-name")
+        return run_serve(args)
+    if args.command == "utilization":
+        return run_utilization(args)
+    if args.command == "bench":
+        return run_bench(args)
+    return run_gui(args)
@@ -0,0 +1,78 @@
+"""boto3 client creation and response paging shared by every fetch"""
+import threading
+import weakref
+
+from botocore.config import Config
+
+from aws_ri_inventory import progress
+from aws_ri_inventory import throttling
+from aws_ri_inventory import tracing
+
+# Retries are scheduled by the throttling module, so botocore only makes one attempt.
+# A client never has more requests in flight than its limiter allows, so its
+# connection pool is sized to match.
+CLIENT_CONFIG = Config(
+    retries={"mode": "standard", "total_max_attempts": 1},
+    max_pool_connections=throttling.MAX_CONCURRENT_REQUESTS
+)
+
+# boto3 sessions are not thread safe, so client creation is serialized per session
+session_locks = weakref.WeakKeyDictionary()
+session_locks_guard = threading.Lock()
+
+# {session: {(service, region): client}}. Each account is fetched through one
+# long-lived session, so this pools clients per account, service and region.
+client_pool = weakref.WeakKeyDictionary()
+
+def create_client(session, service_name, region_name=None):
+    """Return the session's client for service_name in region_name, creating it on first use.
+
+    botocore clients are thread safe, so every stage and every refresh that
+    uses the session shares one client, with its endpoint, credentials and
+    open connections, instead of building a new one per call site.
+    """
+    with session_locks_guard:
+        session_lock = session_locks.setdefault(session, threading.Lock())
+        session_clients = client_pool.setdefault(session, {})
+    with session_lock:
+        key = (service_name, region_name)
+        if key not in session_clients:
+            client = session.client(service_name, region_name=region_name, config=CLIENT_CONFIG)
+            throttling.schedule_client(session, client)
+            session_clients[key] = tracing.instrument_client(client)
+        return session_clients[key]
+
+def iter_pages(client, operation_name, **kwargs):
+    """Yield every response page of an API call, counting and reporting each one.
+
+    Raises FetchCancelled instead of asking for the next page once the fetch is cancelled.
+    """
+    for page_number, page in enumerate(iter_response_pages(client, operation_name, **kwargs), 1):
+        tracing.count("pages")
+        progress.report(operation=operation_name, region=client.meta.region_name, page=page_number)
+        yield page
+        progress.check_cancelled()
+
+def iter_response_pages(client, operation_name, **kwargs):
+    """Yield every response page of an API call.
+
+    Uses the boto3 paginator when the operation has one, otherwise follows
+    NextPageToken/NextToken until the service stops returning one.
+    """
+    if client.can_paginate(operation_name):
+        yield from client.get_paginator(operation_name).paginate(**kwargs)
+        return
+
+    operation = getattr(client, operation_name)
+    while True:
+        response = operation(**kwargs)
+        yield response
+
+        next_token = None
+        for token_key in ("NextPageToken", "NextToken"):
+            if response.get(token_key):
+                next_token = token_key
+                break
+        if next_token is None:
+            return
+        kwargs = dict(kwargs, **{next_token: response[next_token]})
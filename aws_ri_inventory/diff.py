@@ -0,0 +1,134 @@
+"""Changes between two merged inventories, matched by ReservedInstancesId.
+
+A refresh usually changes a handful of RIs: a listing sells, an RI retires
+or a new one is bought. diff_inventory finds them with vectorized column
+comparisons, so the results table only has to redraw those rows.
+"""
+import numpy as np
+import pandas as pd
+
+from aws_ri_inventory.merge import JOIN_KEY, index_by_ri
+
+# Columns computed from the time of the merge. They move every day, so a row
+# where only these differ is "updated" rather than "changed".
+DERIVED_COLUMNS = ("DaysToExpiry", "DaysOnMarket", "TotalDaysOnMarket")
+
+CHANGE_KINDS = ("added", "removed", "changed", "updated")
+
+def ri_index(df):
+    if df is None or JOIN_KEY not in df.columns:
+        return pd.DataFrame(index=pd.Index([], name=JOIN_KEY))
+    return index_by_ri(df)
+
+def values_differ(old_values, new_values):
+    """Return a bool array of where two aligned columns differ, treating two missing values as equal"""
+    both_missing = old_values.isna().to_numpy() & new_values.isna().to_numpy()
+    if isinstance(old_values.dtype, pd.CategoricalDtype) and isinstance(new_values.dtype, pd.CategoricalDtype):
+        # Categoricals only compare with the same categories
+        categories = old_values.cat.categories.union(new_values.cat.categories)
+        old_values = old_values.cat.set_categories(categories)
+        new_values = new_values.cat.set_categories(categories)
+    elif old_values.dtype != new_values.dtype:
+        old_values = old_values.astype(object)
+        new_values = new_values.astype(object)
+    equal = (old_values == new_values).fillna(False).to_numpy(dtype=bool)
+    return ~(equal | both_missing)
+
+def unique_rows(matrix):
+    """Return (distinct rows, index of each row's distinct row) of a boolean matrix.
+
+    Every row is packed into one int64 key per 63 columns, so any number of
+    columns works and up to 63 of them, the usual case, take a 1-D unique of
+    the keys rather than a far slower np.unique(matrix, axis=0).
+    """
+    keys = np.column_stack([
+        matrix[:, start:start + 63] @ (1 << np.arange(min(63, matrix.shape[1] - start), dtype=np.int64))
+        for start in range(0, matrix.shape[1], 63)
+    ])
+    if keys.shape[1] == 1:
+        _, first, inverse = np.unique(keys[:, 0], return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    return matrix[first], inverse.reshape(-1)
+
+def diff_inventory(df_old, df_new):
+    """Compare two merged inventories by ReservedInstancesId.
+
+    Returns one row per RI that was added, removed, changed or only updated
+    (only DERIVED_COLUMNS differ), with ReservedInstancesId, Change and
+    ChangedColumns, the names of the columns that differ joined by ", ".
+    """
+    old = ri_index(df_old)
+    new = ri_index(df_new)
+    added = new.index.difference(old.index, sort=False)
+    removed = old.index.difference(new.index, sort=False)
+    common = new.index.intersection(old.index, sort=False)
+
+    old_common = old.reindex(common)
+    new_common = new.reindex(common)
+    differs = {}
+    for column in new.columns.union(old.columns, sort=False):
+        if column not in old.columns:
+            column_differs = new_common[column].notna().to_numpy()
+        elif column not in new.columns:
+            column_differs = old_common[column].notna().to_numpy()
+        else:
+            column_differs = values_differ(old_common[column], new_common[column])
+        if column_differs.any():
+            differs[column] = column_differs
+
+    # Rows are grouped by which columns changed, so each combination is named once
+    columns = list(differs)
+    if columns:
+        column_matrix = np.column_stack([differs[column] for column in columns])
+        changed_positions = np.flatnonzero(column_matrix.any(axis=1))
+        unique_patterns, pattern_of_row = unique_rows(column_matrix[changed_positions])
+    else:
+        changed_positions = np.array([], dtype=np.int64)
+        unique_patterns = np.zeros((0, 0), dtype=bool)
+        pattern_of_row = np.array([], dtype=np.int64)
+
+    pattern_columns = [[column for column, changed in zip(columns, pattern) if changed] for pattern in unique_patterns]
+    pattern_names = np.array([", ".join(names) for names in pattern_columns], dtype=object)
+    pattern_kinds = np.array(
+        ["updated" if set(names) <= set(DERIVED_COLUMNS) else "changed" for names in pattern_columns],
+        dtype=object
+    )
+    changed_ids = list(common[changed_positions])
+    kinds = list(pattern_kinds[pattern_of_row])
+    changed_columns = list(pattern_names[pattern_of_row])
+
+    return pd.DataFrame({
+        JOIN_KEY: list(added) + list(removed) + changed_ids,
+        "Change": ["added"] * len(added) + ["removed"] * len(removed) + kinds,
+        "ChangedColumns": [""] * (len(added) + len(removed)) + changed_columns,
+    })
+
+def count_changes(df_changes):
+    """Return {kind: number of RIs} for every kind of change"""
+    counts = df_changes["Change"].value_counts()
+    return {kind: int(counts.get(kind, 0)) for kind in CHANGE_KINDS}
+
+def row_index(df):
+    """Return the RI IDs of a table's rows, in row position order"""
+    return pd.Index(df[JOIN_KEY])
+
+def patch_positions(row_ids, df_changes):
+    """Return where to patch a table whose rows hold row_ids with df_changes.
+
+    Returns (row_ids, added, removed, changed, updated), where row_ids has the
+    added RIs appended, so the other rows keep their positions, and the rest
+    are arrays of row positions. A removed RI keeps its position, and gets it
+    back if a later refresh adds it again, so row_ids stays unique.
+    """
+    added_ids = pd.Index(df_changes.loc[df_changes["Change"] == "added", JOIN_KEY])
+    row_ids = row_ids.append(added_ids[row_ids.get_indexer(added_ids) < 0])
+
+    def positions(kind):
+        return row_ids.get_indexer(df_changes.loc[df_changes["Change"] == kind, JOIN_KEY])
+    return row_ids, positions("added"), positions("removed"), positions("changed"), positions("updated")
+
+def align_rows(df, row_ids):
+    """Return df's rows in the order of row_ids, with blank rows for the IDs df does not have"""
+    df_unique = df.drop_duplicates(JOIN_KEY, keep="last").set_index(JOIN_KEY, drop=False)
+    return df_unique.reindex(row_ids).reset_index(drop=True)
@@ -0,0 +1,121 @@
+"""Chunked export of the inventory to CSV, Parquet and compressed JSON Lines.
+
+Frames are written EXPORT_CHUNK_ROWS rows at a time, so an export never
+holds a converted copy of the whole frame, and progress can be reported
+after every chunk. Each export is written to a ".part" file next to the
+target, which only replaces the target once it is complete.
+"""
+import gzip
+import io
+import os
+
+from aws_ri_inventory.schema import DATE_FORMAT
+
+EXPORT_CHUNK_ROWS = 10000
+
+# File name endings and the export format they select
+EXPORT_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".jsonl.gz": "jsonl.gz",
+    ".jsonl.zst": "jsonl.zst",
+}
+
+def export_format(path):
+    for suffix, fmt in EXPORT_FORMATS.items():
+        if path.lower().endswith(suffix):
+            return fmt
+    raise ValueError(f"Cannot tell the export format of {path}, use one of: {', '.join(EXPORT_FORMATS)}")
+
+def iter_chunks(df, chunk_rows):
+    """Yield row slices of df, at least one so that empty frames still get a header or schema"""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def write_csv_chunks(df, chunk_rows, path):
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        for i, chunk in enumerate(iter_chunks(df, chunk_rows)):
+            chunk.to_csv(csv_file, header=i == 0, index=False, date_format=DATE_FORMAT)
+            yield len(chunk)
+
+def write_jsonl_chunks(df, chunk_rows, text_file):
+    for chunk in iter_chunks(df, chunk_rows):
+        if len(chunk):
+            lines = chunk.to_json(orient="records", lines=True, date_format="iso", date_unit="s")
+            text_file.write(lines if lines.endswith("\n") else lines + "\n")
+        yield len(chunk)
+
+def write_jsonl_gz_chunks(df, chunk_rows, path):
+    with gzip.open(path, "wt", encoding="utf-8") as text_file:
+        yield from write_jsonl_chunks(df, chunk_rows, text_file)
+
+def write_jsonl_zst_chunks(df, chunk_rows, path):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd export needs the zstandard package: pip install zstandard")
+    with open(path, "wb") as raw_file:
+        compressed_file = zstandard.ZstdCompressor().stream_writer(raw_file, closefd=False)
+        with io.TextIOWrapper(compressed_file, encoding="utf-8") as text_file:
+            yield from write_jsonl_chunks(df, chunk_rows, text_file)
+
+def parquet_schema(df):
+    """Return the Arrow schema of df, with object columns typed as strings.
+
+    The schema is taken from the whole frame rather than from its first chunk,
+    and object columns are forced to strings, so a column that is empty in
+    one chunk does not get a null type that the next chunks cannot be cast to.
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, name in enumerate(schema.names):
+        if df[name].dtype == object or pa.types.is_null(schema.field(i).type):
+            schema = schema.set(i, pa.field(name, pa.string()))
+    return schema
+
+def write_parquet_chunks(df, chunk_rows, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs the pyarrow package: pip install pyarrow")
+
+    # Every chunk is written as a row group cast to the schema of the whole frame
+    schema = parquet_schema(df)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in iter_chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield len(chunk)
+
+EXPORT_WRITERS = {
+    "csv": write_csv_chunks,
+    "parquet": write_parquet_chunks,
+    "jsonl.gz": write_jsonl_gz_chunks,
+    "jsonl.zst": write_jsonl_zst_chunks,
+}
+
+def export_frame(df, path, fmt=None, chunk_rows=None, on_progress=None):
+    """Write df to path in chunks. Returns the number of rows written.
+
+    fmt defaults to the format selected by the file name. on_progress, if
+    given, is called with (rows written, total rows) after every chunk.
+    """
+    if fmt is None:
+        fmt = export_format(path)
+    if chunk_rows is None:
+        chunk_rows = EXPORT_CHUNK_ROWS
+
+    part_path = f"{path}.part"
+    rows = 0
+    try:
+        for chunk_rows_written in EXPORT_WRITERS[fmt](df, chunk_rows, part_path):
+            rows += chunk_rows_written
+            if on_progress:
+                on_progress(rows, len(df))
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return rows
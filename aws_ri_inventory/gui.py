@@ -0,0 +1,967 @@
+"""Tk desktop application for browsing the Reserved Instance inventory"""
+import numpy as np
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import queue
+import threading
+
+from aws_ri_inventory import progress
+from aws_ri_inventory.diff import align_rows, count_changes, diff_inventory, patch_positions, row_index
+from aws_ri_inventory.merge import JOIN_KEY
+from aws_ri_inventory.inventory import (
+    create_aws_session,
+    fetch_errors,
+    fetch_inventory,
+    load_last_inventory,
+)
+from aws_ri_inventory.export import export_frame
+from aws_ri_inventory.rollups import ROLLUP_DIMENSIONS, ROLLUPS, RollupEngine
+from aws_ri_inventory.service import fetch_service_inventory
+from aws_ri_inventory.tracing import format_summary, span, trace_summary, write_trace
+from aws_ri_inventory.table import (
+    build_search_index,
+    column_sort_order,
+    refine_search,
+    search_positions,
+    sort_positions,
+    state_positions,
+    stringify_columns,
+    stringify_rows,
+    value_masks,
+)
+
+# Global variables to store data
+df_results = None
+progress_var = None
+progress_bar = None
+mainApp = None
+
+# Patches the open results window with a refreshed inventory, None while no window is open
+patch_results = None
+
+# Whether the running fetch opened a results window for its partial results,
+# so that a window the user closes is not reopened by the next ones
+partial_window_shown = False
+
+# Progress events posted by fetch threads, applied on the Tk thread. Only the
+# events of fetch_token's fetch are shown; a cancelled fetch's late ones are dropped.
+progress_events = queue.Queue()
+fetch_token = None
+fetch_thread = None
+fetch_phase = ""
+
+# How often the main window applies the progress events of a running fetch
+PROGRESS_POLL_MS = 100
+
+# Rows kept as Treeview items beyond the ones that fit in the results table
+VIRTUAL_ROW_BUFFER = 2
+
+# Delay after the last keystroke before the search box filters the table
+SEARCH_DEBOUNCE_MS = 150
+
+# Rows shown in the summary pane of the results window, and the rollup it opens on
+SUMMARY_ROWS = 8
+SUMMARY_ROLLUP = ("Region", "InstanceFamily")
+
+# Every fetch is also saved here, in any export format; None turns it off
+AUTOSAVE_PATH = "ris.csv"
+
+# How often the results window checks on a running export
+EXPORT_POLL_MS = 100
+EXPORT_FILETYPES = [
+    ("CSV files", "*.csv"),
+    ("Parquet files", "*.parquet"),
+    ("JSON Lines, gzip", "*.jsonl.gz"),
+    ("JSON Lines, zstd", "*.jsonl.zst"),
+]
+
+# Show how long each stage of the last fetch took in the status line
+STATUS_TRACE_SUMMARY = True
+STATUS_TRACE_STAGES = ("Open Account", "RI Inventory", "RI Listings", "RI Utilization", "Merge", "Read Service")
+
+class VirtualTreeview:
+    """Shows a large list of pre-stringified rows in a ttk.Treeview.
+
+    Only the rows that fit in the widget, plus a small buffer, exist as tree
+    items. Scrolling moves a window over the current view (a sequence of row
+    positions) and rewrites those items' values in place, so scrolling and
+    changing the view cost the same whatever the number of rows. row_tags
+    maps row positions to the Treeview tag their item gets while shown.
+
+    The selection belongs to a row, not to the item showing it: selected_row
+    is the position of the selected row, and its item is selected again
+    whenever the row is shown, wherever the window has moved.
+    """
+
+    def __init__(self, tree, scrollbar, rowheight):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.rowheight = rowheight
+        self.rows = []
+        self.view = []
+        self.offset = 0
+        self.page_size = 1
+        self.item_ids = []
+        self.row_tags = {}
+        self.selected_row = None
+
+        tree.configure(selectmode='browse')
+        scrollbar.configure(command=self.yview)
+        tree.bind('<<TreeviewSelect>>', self.on_select)
+        tree.bind('<Configure>', self.on_resize)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            tree.bind(sequence, self.on_mousewheel)
+        tree.bind('<Prior>', lambda event: self.scroll_by(-self.page_size))
+        tree.bind('<Next>', lambda event: self.scroll_by(self.page_size))
+        tree.bind('<Home>', lambda event: self.scroll_to(0))
+        tree.bind('<End>', lambda event: self.scroll_to(len(self.view)))
+        tree.bind('<Up>', lambda event: self.on_arrow(-1))
+        tree.bind('<Down>', lambda event: self.on_arrow(1))
+
+    def set_rows(self, rows, view=None):
+        self.rows = rows
+        self.set_view(range(len(rows)) if view is None else view)
+
+    def set_view(self, view, keep_offset=False):
+        self.view = view
+        self.offset = max(0, min(self.offset, len(view) - self.page_size)) if keep_offset else 0
+        self.refresh()
+
+    def refresh(self):
+        count = max(0, min(self.page_size + VIRTUAL_ROW_BUFFER, len(self.view) - self.offset))
+        while len(self.item_ids) < count:
+            self.item_ids.append(self.tree.insert('', 'end'))
+        while len(self.item_ids) > count:
+            self.tree.delete(self.item_ids.pop())
+
+        selected_item = None
+        for position, item_id in enumerate(self.item_ids):
+            row = self.view[self.offset + position]
+            self.tree.item(item_id, values=self.rows[row], tags=self.row_tags.get(row, ()))
+            if row == self.selected_row:
+                selected_item = item_id
+        self.tree.yview_moveto(0)
+
+        # Keep the selection on the selected row, or on no item while it is out of the window
+        selection = self.tree.selection()
+        if selected_item is None:
+            if selection:
+                self.tree.selection_remove(selection)
+        elif selection != (selected_item,):
+            self.tree.selection_set(selected_item)
+            self.tree.focus(selected_item)
+
+        total = len(self.view)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.page_size) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.view) - self.page_size))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+        return 'break'
+
+    def scroll_by(self, rows):
+        return self.scroll_to(self.offset + rows)
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * len(self.view)))
+        elif args[0] == 'scroll':
+            step = self.page_size if args[2] == 'pages' else 1
+            self.scroll_by(int(args[1]) * step)
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            return self.scroll_by(-3)
+        return self.scroll_by(3)
+
+    def on_select(self, event):
+        # Empty when refresh moved the selected row out of the window, which keeps it selected
+        selection = self.tree.selection()
+        if selection and selection[0] in self.item_ids:
+            self.selected_row = self.view[self.offset + self.item_ids.index(selection[0])]
+
+    def on_arrow(self, step):
+        # Let the tree move the selection inside the window, and scroll at its edges
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.item_ids:
+            return None
+        position = self.item_ids.index(selection[0]) + step
+        if 0 <= position < min(self.page_size, len(self.item_ids)):
+            return None
+        # At an edge the selection moves to the next row and the window follows it
+        if 0 <= self.offset + position < len(self.view):
+            self.selected_row = self.view[self.offset + position]
+            offset = self.offset
+            self.scroll_by(step)
+            if self.offset == offset:
+                self.refresh()
+        return 'break'
+
+    def on_resize(self, event):
+        header_height = self.rowheight
+        if self.item_ids:
+            bbox = self.tree.bbox(self.item_ids[0])
+            if bbox:
+                header_height = bbox[1]
+        page_size = max(1, (event.height - header_height) // self.rowheight)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.offset = max(0, min(self.offset, len(self.view) - self.page_size))
+            self.refresh()
+
+def show_results_window():
+    global df_results, patch_results
+    if df_results is None or df_results.empty:
+        messagebox.showinfo("No Data", "No data to display")
+        return
+    
+    # Missing values stay missing in the typed data and are only shown blank in the display strings
+    df_typed = df_results.reset_index(drop=True)
+    
+    # Create results window with clean styling
+    results_window = tk.Toplevel(mainApp)
+    results_window.title('Reserved Instance Data')
+    results_window.geometry('1300x930')
+    results_window.configure(bg='white')
+    
+    # Configure clean styling for results window
+    style = ttk.Style()
+    style.configure('Clean.TFrame', background='white')
+    style.configure('Header.TLabel', font=('Arial', 14, 'bold'), background='white', foreground='#1a1a1a')
+    style.configure('Info.TLabel', font=('Arial', 9), background='white', foreground='#666666')
+    style.configure('Search.TEntry', fieldbackground='white', borderwidth=1, relief='solid', padding=6)
+    style.configure('Clean.Treeview', font=('Arial', 9), rowheight=22)
+    style.configure('Clean.Treeview.Heading', font=('Arial', 9, 'bold'), relief='flat')
+    
+    # Main container
+    main_container = ttk.Frame(results_window, style='Clean.TFrame', padding="20")
+    main_container.pack(fill='both', expand=True)
+    
+    # Header
+    header_frame = ttk.Frame(main_container, style='Clean.TFrame')
+    header_frame.pack(fill='x', pady=(0, 15))
+    
+    ttk.Label(
+        header_frame,
+        text="Reserved Instance Data",
+        style='Header.TLabel'
+    ).pack(side='left')
+    
+    info_label = ttk.Label(
+        header_frame,
+        text=f"{len(df_results)} records",
+        style='Info.TLabel'
+    )
+    info_label.pack(side='right')
+    
+    # Search and filter
+    search_frame = ttk.Frame(main_container, style='Clean.TFrame')
+    search_frame.pack(fill='x', pady=(0, 15))
+    
+    ttk.Label(search_frame, text="Search:", font=('Arial', 9), background='white').pack(side='left', padx=(0, 8))
+    search_var = tk.StringVar()
+    search_entry = ttk.Entry(search_frame, textvariable=search_var, width=30, style='Search.TEntry')
+    search_entry.pack(side='left', padx=(0, 20))
+
+    state_filter = None
+    if 'State' in df_typed.columns:
+        ttk.Label(search_frame, text="State:", font=('Arial', 9), background='white').pack(side='left', padx=(0, 8))
+        state_filter = ttk.Combobox(search_frame, width=12, font=('Arial', 9))
+        state_masks = value_masks(df_typed['State'])
+        state_filter['values'] = ['All'] + list(state_masks)
+        state_filter.set('All')
+        state_filter.pack(side='left')
+    
+    # Data table
+    tree_frame = ttk.Frame(main_container, style='Clean.TFrame')
+    tree_frame.pack(fill='both', expand=True, pady=(0, 15))
+    
+    # Create treeview
+    columns = list(df_typed.columns)
+    tree = ttk.Treeview(
+        tree_frame, 
+        columns=columns, 
+        show='headings',
+        style='Clean.Treeview'
+    )
+    
+    # Track sorting state. Each column's sort order is computed from the typed
+    # data on its first sort and reused, reversed, on later sorts.
+    sort_reverse = {col: False for col in columns}
+    sort_orders = {}
+    active_sort = {'col': None, 'reverse': False}
+    
+    def sorted_positions(positions):
+        col = active_sort['col']
+        if col is None:
+            return positions
+        if col not in sort_orders:
+            with span("Sort", column=col):
+                sort_orders[col] = column_sort_order(df_typed[col])
+        order = sort_orders[col]
+        if active_sort['reverse']:
+            order = order[::-1]
+        return sort_positions(order, positions)
+    
+    def sort_column(col):
+        """Sort the treeview by the selected column"""
+        active_sort['col'] = col
+        active_sort['reverse'] = sort_reverse[col]
+        sort_reverse[col] = not sort_reverse[col]
+        apply_filters()
+        
+        direction = " ↓" if not sort_reverse[col] else " ↑"
+        tree.heading(col, text=f"{col}{direction}")
+        
+        for other_col in columns:
+            if other_col != col:
+                tree.heading(other_col, text=other_col)
+    
+    # Configure columns
+    def configure_columns():
+        tree.configure(columns=columns)
+        for col in columns:
+            sort_reverse.setdefault(col, False)
+            tree.heading(col, text=col, command=lambda c=col: sort_column(c))
+            tree.column(col, width=120, minwidth=80)
+
+    configure_columns()
+
+    # Rows added or changed by the last refresh
+    tree.tag_configure('added', background='#e6f4ea')
+    tree.tag_configure('changed', background='#fff4d6')
+    
+    # Scrollbars - the vertical one scrolls the virtual view rather than the tree items
+    v_scrollbar = ttk.Scrollbar(tree_frame, orient='vertical')
+    h_scrollbar = ttk.Scrollbar(tree_frame, orient='horizontal', command=tree.xview)
+    tree.configure(xscrollcommand=h_scrollbar.set)
+    virtual_tree = VirtualTreeview(tree, v_scrollbar, rowheight=22)
+    
+    v_scrollbar.pack(side='right', fill='y')
+    h_scrollbar.pack(side='bottom', fill='x')
+    tree.pack(side='left', fill='both', expand=True)
+    
+    with span("Populate", rows=len(df_typed)):
+        # Every row is converted to display strings once; the tree only shows a window of them
+        display_rows = stringify_rows(df_typed)
+
+        # Search index, built once per window
+        all_positions = np.arange(len(display_rows))
+        search_index = build_search_index(display_rows)
+
+    # The rows matching the last search; a query that extends it only searches those
+    last_search = {'text': '', 'positions': all_positions}
+    pending_filter = None
+
+    # Population and filter functions
+    def populate_tree(positions, keep_offset=False):
+        virtual_tree.set_view(sorted_positions(positions), keep_offset)
+    
+    def apply_filters(*args, keep_offset=False):
+        nonlocal pending_filter
+        pending_filter = None
+
+        with span("Filter") as filter_args:
+            search_text = search_var.get().lower()
+            last_search['positions'] = refine_search(
+                search_index, all_positions, last_search['text'], last_search['positions'], search_text
+            )
+            last_search['text'] = search_text
+            positions = last_search['positions']
+        
+            if state_filter is not None and 'State' in df_typed.columns:
+                positions = state_positions(positions, state_masks, state_filter.get())
+        
+            populate_tree(positions, keep_offset)
+            filter_args["rows"] = len(positions)
+        info_label.config(text=f"Showing {len(positions)} of {len(df_results)} records{change_summary['text']}")
+
+    def schedule_filters(*args):
+        nonlocal pending_filter
+        if pending_filter is not None:
+            results_window.after_cancel(pending_filter)
+        pending_filter = results_window.after(SEARCH_DEBOUNCE_MS, apply_filters)
+    
+    # Bind filters
+    search_var.trace_add('write', schedule_filters)
+    if state_filter is not None:
+        state_filter.bind('<<ComboboxSelected>>', apply_filters)
+    
+    # Initial population
+    virtual_tree.set_rows(display_rows)
+
+    # Summary pane: rollups of the whole inventory, computed once here and
+    # patched with the changes of every refresh, so switching them is instant
+    with span("Rollups", rows=len(df_typed)):
+        rollups = RollupEngine(df_typed)
+    summary_choices = {" / ".join(dimensions): dimensions for dimensions in ROLLUPS}
+    summary_sort = {'col': 'UnusedHours', 'ascending': False}
+
+    summary_frame = ttk.Frame(main_container, style='Clean.TFrame')
+    summary_frame.pack(fill='x', pady=(0, 15))
+    summary_header = ttk.Frame(summary_frame, style='Clean.TFrame')
+    summary_header.pack(fill='x', pady=(0, 8))
+
+    ttk.Label(summary_header, text="Summary by:", font=('Arial', 9), background='white').pack(side='left', padx=(0, 8))
+    summary_by = ttk.Combobox(summary_header, width=40, font=('Arial', 9), state='readonly', values=list(summary_choices))
+    summary_by.set(" / ".join(SUMMARY_ROLLUP))
+    summary_by.pack(side='left')
+    summary_label = ttk.Label(summary_header, style='Info.TLabel')
+    summary_label.pack(side='right')
+
+    summary_tree = ttk.Treeview(summary_frame, show='headings', height=SUMMARY_ROWS, style='Clean.Treeview')
+    summary_scrollbar = ttk.Scrollbar(summary_frame, orient='vertical', command=summary_tree.yview)
+    summary_tree.configure(yscrollcommand=summary_scrollbar.set)
+    summary_scrollbar.pack(side='right', fill='y')
+    summary_tree.pack(side='left', fill='x', expand=True)
+
+    def sort_summary(col):
+        """Sort the summary by col, group labels ascending and measures descending first"""
+        if summary_sort['col'] == col:
+            summary_sort['ascending'] = not summary_sort['ascending']
+        else:
+            summary_sort['col'] = col
+            summary_sort['ascending'] = col in ROLLUP_DIMENSIONS
+        show_summary()
+
+    def show_summary(*args):
+        with span("Summary", rollup=summary_by.get()):
+            df_rollup = rollups.rollup(summary_choices[summary_by.get()])
+            if summary_sort['col'] in df_rollup.columns:
+                df_rollup = df_rollup.sort_values(summary_sort['col'], ascending=summary_sort['ascending'], kind='stable')
+
+            summary_tree.configure(columns=list(df_rollup.columns))
+            for col in df_rollup.columns:
+                summary_tree.heading(col, text=col, command=lambda c=col: sort_summary(c))
+                summary_tree.column(col, width=110, minwidth=60)
+            summary_tree.delete(*summary_tree.get_children())
+            for row in stringify_rows(df_rollup):
+                summary_tree.insert('', 'end', values=row)
+
+        overall = rollups.overall()
+        summary_label.config(
+            text=f"{overall['UnusedHours']:,.0f} unused hours, {overall['ListedUnusedHours']:,.0f} of them on "
+                 f"{overall['Listed']:,.0f} RIs listed on the marketplace"
+        )
+
+    summary_by.bind('<<ComboboxSelected>>', show_summary)
+    show_summary()
+
+    # Row positions stay fixed while the window is open: a refresh appends the
+    # RIs it added, blanks the ones it removed and restringifies only the
+    # changed rows, so patching costs O(changes) in Treeview work
+    row_ids = row_index(df_typed)
+    live_rows = np.ones(len(df_typed), dtype=bool)
+    change_summary = {'text': ''}
+
+    def patch_rows(df_new, df_patch, df_changes=None):
+        """Show a refreshed or partial inventory in place.
+
+        df_patch, the diff from the inventory shown to df_new, decides which
+        rows are redrawn. df_changes, the diff from the inventory shown before
+        the fetch, decides which rows are highlighted; partial results have
+        none. New columns, such as the listing columns arriving after a
+        partial inventory without them, are added after the shown ones, and
+        only their strings are computed and appended to every row.
+        """
+        nonlocal df_typed, row_ids, live_rows, search_index, all_positions, state_masks, columns
+
+        with span("Patch", changes=len(df_patch)):
+            row_ids, added, removed, changed, updated = patch_positions(row_ids, df_patch)
+            df_typed = align_rows(df_new, row_ids)
+            new_slots = len(row_ids) - len(live_rows)
+            live_rows = np.append(live_rows, np.zeros(new_slots, dtype=bool))
+            live_rows[added] = True
+            live_rows[removed] = False
+            all_positions = np.flatnonzero(live_rows)
+
+            display_rows.extend([()] * new_slots)
+            search_index = np.append(search_index, np.full(new_slots, '', dtype=object))
+            touched = np.concatenate([changed, updated, added])
+
+            new_columns = [col for col in df_typed.columns if col not in columns]
+            rebuilt = not set(columns) <= set(df_typed.columns)
+            if rebuilt:
+                # Columns were dropped, so every row is converted again
+                columns = list(df_typed.columns)
+                display_rows[:] = stringify_rows(df_typed)
+                search_index = build_search_index(display_rows)
+            elif new_columns:
+                columns = columns + new_columns
+                new_cells = list(zip(*stringify_columns(df_typed[new_columns]).values()))
+                display_rows[:] = [row + cells for row, cells in zip(display_rows, new_cells)]
+                search_index = search_index + ('\x1f' + build_search_index(new_cells))
+
+                # Rows whose only changes are in the new columns show them already
+                patched = df_patch[df_patch["Change"].isin(("changed", "updated"))]
+                spliced_patterns = [
+                    names for names in patched["ChangedColumns"].unique()
+                    if set(names.split(", ")) <= set(new_columns)
+                ]
+                spliced = row_ids.get_indexer(patched.loc[patched["ChangedColumns"].isin(spliced_patterns), JOIN_KEY])
+                touched = np.setdiff1d(touched, spliced)
+
+            if new_columns or rebuilt:
+                configure_columns()
+                if active_sort['col'] in columns:
+                    direction = " ↓" if active_sort['reverse'] else " ↑"
+                    tree.heading(active_sort['col'], text=f"{active_sort['col']}{direction}")
+                else:
+                    active_sort['col'] = None
+
+            # Rows keep the shown column order, whatever the order of df_new's columns
+            df_typed = df_typed[columns]
+            if not rebuilt:
+                touched_rows = stringify_rows(df_typed.iloc[touched])
+                for position, row in zip(touched, touched_rows):
+                    display_rows[position] = row
+                search_index[touched] = build_search_index(touched_rows)
+            if new_columns or rebuilt:
+                # Every row may match a search differently now
+                touched = all_positions
+
+            virtual_tree.row_tags = {}
+            if df_changes is not None:
+                for kind in ('added', 'changed'):
+                    tagged = row_ids.get_indexer(df_changes.loc[df_changes["Change"] == kind, JOIN_KEY])
+                    virtual_tree.row_tags.update(dict.fromkeys(tagged[tagged >= 0].tolist(), kind))
+            sort_orders.clear()
+            if state_filter is not None and 'State' in df_typed.columns:
+                state_masks = value_masks(df_typed['State'])
+                state_filter['values'] = ['All'] + list(state_masks)
+
+            # Only the touched rows need to be searched again
+            search_text = last_search['text']
+            if search_text:
+                kept = last_search['positions'][live_rows[last_search['positions']]]
+                matched = search_positions(search_index, touched, search_text)
+                last_search['positions'] = np.union1d(np.setdiff1d(kept, touched), matched)
+            else:
+                last_search['positions'] = all_positions
+
+        with span("Rollups", changes=len(df_patch)):
+            rollups.update(df_new, df_patch)
+        show_summary()
+
+        if df_changes is None:
+            change_summary['text'] = ""
+        else:
+            counts = count_changes(df_changes)
+            change_summary['text'] = f" - {counts['added']} added, {counts['removed']} removed, {counts['changed']} changed"
+        apply_filters(keep_offset=True)
+
+    def forget_window(event):
+        global patch_results
+        if event.widget is results_window and patch_results is patch_rows:
+            patch_results = None
+
+    patch_results = patch_rows
+    results_window.bind('<Destroy>', forget_window, add='+')
+    
+    # Buttons
+    button_frame = ttk.Frame(main_container, style='Clean.TFrame')
+    button_frame.pack(fill='x')
+    
+    def export_data():
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=EXPORT_FILETYPES,
+            title="Export data"
+        )
+        if not filename:
+            return
+
+        # The worker only updates this dict; the window polls it for progress
+        df_export = df_results
+        export_state = {'rows': 0, 'done': False, 'error': None}
+
+        def run_export():
+            try:
+                with span("Export", rows=len(df_export)):
+                    export_frame(df_export, filename, on_progress=lambda rows, total: export_state.update(rows=rows))
+            except Exception as e:
+                export_state['error'] = str(e)
+            export_state['done'] = True
+
+        def poll_export():
+            if not results_window.winfo_exists():
+                return
+            if not export_state['done']:
+                info_label.config(text=f"Exporting {export_state['rows']} of {len(df_export)} records...")
+                results_window.after(EXPORT_POLL_MS, poll_export)
+                return
+            export_button.state(['!disabled'])
+            info_label.config(text=f"{len(df_export)} records")
+            if export_state['error']:
+                messagebox.showerror("Export Failed", f"Could not export to {filename}: {export_state['error']}")
+            else:
+                messagebox.showinfo("Export Complete", f"Data exported to {filename}")
+
+        export_button.state(['disabled'])
+        threading.Thread(target=run_export, daemon=True).start()
+        poll_export()
+    
+    def export_trace():
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Trace files", "*.json")],
+            title="Save trace file"
+        )
+        if filename:
+            write_trace(filename)
+            messagebox.showinfo("Export Complete", f"Trace exported to {filename}")
+    
+    export_button = ttk.Button(
+        button_frame, 
+        text="Export", 
+        command=export_data,
+        style='Primary.TButton'
+    )
+    export_button.pack(side='left', padx=(0, 10))
+    
+    ttk.Button(
+        button_frame, 
+        text="Export Trace", 
+        command=export_trace,
+        style='Secondary.TButton'
+    ).pack(side='left', padx=(0, 10))
+    
+    ttk.Button(
+        button_frame, 
+        text="Close", 
+        command=results_window.destroy,
+        style='Secondary.TButton'
+    ).pack(side='right')
+
+def create_ri_inventory_and_listings(input_access_key_id, input_secret_access_key, input_session_token,
+                                     account_ids=None, role_name=None, token=None, previous_fetch=None,
+                                     df_previous=None, service_url=None):
+    """Fetch the inventory on a worker thread, posting its progress and outcome as progress events.
+
+    With a service_url the inventory is read from that inventory service
+    instead of AWS, and the credentials are not used.
+
+    Nothing here touches Tk: the Tk thread applies the events in poll_progress.
+    A cancelled previous_fetch is waited for first, so fetches never overlap.
+    While sources arrive, partial inventories are posted with their diff from
+    the one posted before, so the results window opens on the first RIs and
+    fills in. The result is compared with df_previous, the inventory on screen
+    before the fetch, so the window can highlight what the refresh changed.
+    """
+    if token is None:
+        token = progress.CancelToken()
+    if previous_fetch is not None:
+        previous_fetch.join()
+
+    def diff_shown(df_shown, df_new):
+        if df_shown is None or df_shown.empty:
+            return None
+        with span("Diff", rows=len(df_new)):
+            return diff_inventory(df_shown, df_new)
+
+    shown = {'df': df_previous}
+
+    def show_partial(df_partial):
+        progress.report(outcome="partial", df=df_partial, patch=diff_shown(shown['df'], df_partial))
+        shown['df'] = df_partial
+
+    with progress.cancel_scope(token):
+        try:
+            token.check()
+            if service_url:
+                df_inventory = fetch_service_inventory(service_url)
+            else:
+                aws_session = create_aws_session(input_access_key_id, input_secret_access_key, input_session_token)
+                df_inventory = fetch_inventory(aws_session, account_ids, role_name, on_partial=show_partial)
+
+            if fetch_errors:
+                status = f"Data fetch completed with {len(fetch_errors)} error(s)"
+            else:
+                status = "Data fetch completed!"
+            df_changes = diff_shown(df_previous, df_inventory)
+            if df_changes is not None:
+                counts = count_changes(df_changes)
+                status = f"{status} {counts['added']} added, {counts['removed']} removed, {counts['changed']} changed"
+            df_patch = df_changes if shown['df'] is df_previous else diff_shown(shown['df'], df_inventory)
+            if STATUS_TRACE_SUMMARY:
+                status = f"{status}\n{format_summary(trace_summary(), STATUS_TRACE_STAGES)}"
+
+            for stage, region, error in fetch_errors:
+                print(f"{stage} error in region {region}: {error}")
+            print("Done!")
+
+            # The Tk thread shows or patches the results window when it gets this
+            progress.report(status, outcome="done", df=df_inventory, patch=df_patch, changes=df_changes)
+
+            # Also save a copy, in chunks on this thread while the results window opens
+            if AUTOSAVE_PATH and not df_inventory.empty:
+                export_frame(df_inventory, AUTOSAVE_PATH)
+
+        except progress.FetchCancelled:
+            print("Fetch cancelled")
+            progress.report("Fetch cancelled", outcome="cancelled")
+        except Exception as e:
+            print(f"Error: {e}")
+            progress.report("Error occurred", outcome="error", error=str(e))
+
+def set_progress_bar(done=None, total=None):
+    """Show done of total on the progress bar, or keep it moving while the total is unknown"""
+    if total:
+        if str(progress_bar['mode']) != 'determinate':
+            progress_bar.stop()
+            progress_bar.configure(mode='determinate')
+        progress_bar.configure(maximum=total, value=done)
+    elif str(progress_bar['mode']) != 'indeterminate':
+        progress_bar.configure(mode='indeterminate', value=0)
+        progress_bar.start()
+
+def stop_progress_bar():
+    progress_bar.stop()
+    progress_bar.configure(mode='determinate', value=0)
+
+def show_results(df, df_patch, df_changes=None):
+    """Patch the open results window with df, or open one when there is none to patch"""
+    global df_results
+    df_results = df
+    if patch_results is not None and df_patch is not None:
+        patch_results(df, df_patch, df_changes)
+    else:
+        show_results_window()
+
+def show_progress(event):
+    global fetch_phase, partial_window_shown
+
+    outcome = event.get("outcome")
+    if outcome == "partial":
+        if patch_results is not None or not partial_window_shown:
+            show_results(event["df"], event["patch"])
+            partial_window_shown = True
+    elif outcome == "done":
+        stop_progress_bar()
+        progress_var.set(event["message"])
+        show_results(event["df"], event["patch"], event["changes"])
+    elif outcome == "cancelled":
+        stop_progress_bar()
+        progress_var.set(event["message"])
+    elif outcome == "error":
+        stop_progress_bar()
+        progress_var.set(event["message"])
+        messagebox.showerror("Error", f"An error occurred: {event['error']}")
+    elif event.get("page"):
+        # Pages only add detail to the stage shown last
+        progress_var.set(f"{fetch_phase}\n{event['operation']} in {event['region']}: page {event['page']}")
+    else:
+        fetch_phase = event["message"]
+        if event.get("total"):
+            fetch_phase = f"{fetch_phase} - {event['done']} of {event['total']}"
+            eta = progress.eta_seconds(event.get("started", event["token"].started), event["done"], event["total"])
+            if eta is not None:
+                fetch_phase = f"{fetch_phase}, about {eta:.0f}s left"
+        set_progress_bar(event.get("done"), event.get("total"))
+        progress_var.set(fetch_phase)
+
+def poll_progress():
+    """Apply the progress events posted since the last poll, then poll again"""
+    try:
+        while True:
+            try:
+                event = progress_events.get_nowait()
+            except queue.Empty:
+                break
+            if event["token"] is fetch_token:
+                show_progress(event)
+    finally:
+        # Keep polling even if applying an event failed
+        mainApp.after(PROGRESS_POLL_MS, poll_progress)
+
+def cancel_fetch():
+    """Cancel the running fetch, or close the application when there is none"""
+    if fetch_thread is not None and fetch_thread.is_alive() and not fetch_token.cancelled:
+        fetch_token.cancel()
+        progress_var.set("Cancelling...")
+    else:
+        mainApp.quit()
+
+def get_aws_auth_parms():
+    global fetch_token, fetch_thread, fetch_phase, partial_window_shown
+    aws_access_key_id = aws_access_key_id_entry.get()
+    aws_secret_access_key = aws_secret_access_key_entry.get()
+    aws_session_token = aws_session_token_entry.get()
+    account_ids = account_ids_entry.get().replace(',', ' ').split()
+    role_name = role_name_entry.get().strip()
+    service_url = service_url_entry.get().strip()
+
+    if not service_url and not all([aws_access_key_id, aws_secret_access_key, aws_session_token]):
+        messagebox.showerror("Error", "Please fill in all AWS credential fields")
+        return
+
+    if account_ids and not role_name:
+        messagebox.showerror("Error", "Please enter the role name to assume in the listed accounts")
+        return
+
+    print("Running RI Inventory and Listings")
+
+    # A new fetch replaces the running one, which stops at its next AWS call
+    if fetch_token is not None:
+        fetch_token.cancel()
+    fetch_token = progress.CancelToken()
+    fetch_phase = "Starting fetch..."
+    partial_window_shown = False
+    progress_var.set(fetch_phase)
+    set_progress_bar()
+
+    # Run in separate thread to prevent UI freezing
+    fetch_thread = threading.Thread(target=create_ri_inventory_and_listings,
+                                    args=(aws_access_key_id, aws_secret_access_key, aws_session_token,
+                                          account_ids, role_name, fetch_token, fetch_thread, df_results,
+                                          service_url))
+    fetch_thread.daemon = True
+    fetch_thread.start()
+
+def run_app():
+    """Build the credentials window and run the Tk main loop"""
+    global mainApp, progress_var, progress_bar, df_results
+    global aws_access_key_id_entry, aws_secret_access_key_entry, aws_session_token_entry
+    global account_ids_entry, role_name_entry, service_url_entry
+
+    # Create the AWS auth UI
+    mainApp = tk.Tk()
+    mainApp.title('AWS RI Inventory')
+    mainApp.geometry('520x760')
+    mainApp.configure(bg='white')
+
+    # Configure modern styling
+    style = ttk.Style()
+    style.theme_use('clam')
+
+    # Configure clean, modern styles
+    style.configure('Title.TLabel', font=('Arial', 16, 'bold'), background='white', foreground='#1a1a1a')
+    style.configure('Subtitle.TLabel', font=('Arial', 10), background='white', foreground='#666666')
+    style.configure('Field.TLabel', font=('Arial', 9), background='white', foreground='#333333')
+    style.configure('Modern.TEntry', fieldbackground='white', borderwidth=1, relief='solid', padding=8)
+    style.configure('Primary.TButton', font=('Arial', 10, 'bold'), padding=(20, 20))
+    style.configure('Secondary.TButton', font=('Arial', 10), padding=(15, 20))
+    style.configure('Modern.Horizontal.TProgressbar', 
+                   background='#007acc', 
+                   troughcolor='#e0e0e0',
+                   borderwidth=0,
+                   lightcolor='#007acc',
+                   darkcolor='#007acc')
+
+    # Main container
+    main_frame = ttk.Frame(mainApp, padding="30 25 30 25")
+    main_frame.pack(fill='both', expand=True)
+    main_frame.configure(style='White.TFrame')
+
+    # Configure white frame style
+    style.configure('White.TFrame', background='white')
+
+    # Title
+    title_label = ttk.Label(
+        main_frame, 
+        text='AWS Reserved Instance Inventory',
+        style='Title.TLabel',
+        background='white'
+    )
+    title_label.pack(pady=(0, 5))
+
+    subtitle_label = ttk.Label(
+        main_frame, 
+        text='Enter your AWS credentials to fetch and analyze RI data',
+        style='Subtitle.TLabel',
+        background='white'
+    )
+    subtitle_label.pack(pady=(0, 25))
+
+    # Credentials form
+    form_frame = ttk.Frame(main_frame)
+    form_frame.pack(fill='x', pady=(0, 20))
+    form_frame.configure(style='White.TFrame')
+
+    # ACCESS KEY ID
+    ttk.Label(form_frame, text='Access Key ID', style='Field.TLabel', background='white').pack(anchor='w', pady=(0, 3))
+    aws_access_key_id_entry = ttk.Entry(form_frame, style='Modern.TEntry', show='*')
+    aws_access_key_id_entry.pack(fill='x', pady=(0, 12))
+
+    # SECRET ACCESS KEY  
+    ttk.Label(form_frame, text='Secret Access Key', style='Field.TLabel', background='white').pack(anchor='w', pady=(0, 3))
+    aws_secret_access_key_entry = ttk.Entry(form_frame, style='Modern.TEntry', show='*')
+    aws_secret_access_key_entry.pack(fill='x', pady=(0, 12))
+
+    # SESSION TOKEN
+    ttk.Label(form_frame, text='Session Token', style='Field.TLabel', background='white').pack(anchor='w', pady=(0, 3))
+    aws_session_token_entry = ttk.Entry(form_frame, style='Modern.TEntry', show='*')
+    aws_session_token_entry.pack(fill='x', pady=(0, 12))
+
+    # ACCOUNT IDS (optional multi-account mode)
+    ttk.Label(form_frame, text='Account IDs (optional, comma separated)', style='Field.TLabel', background='white').pack(anchor='w', pady=(0, 3))
+    account_ids_entry = ttk.Entry(form_frame, style='Modern.TEntry')
+    account_ids_entry.pack(fill='x', pady=(0, 12))
+
+    # ROLE NAME
+    ttk.Label(form_frame, text='Role Name to Assume', style='Field.TLabel', background='white').pack(anchor='w', pady=(0, 3))
+    role_name_entry = ttk.Entry(form_frame, style='Modern.TEntry')
+    role_name_entry.pack(fill='x', pady=(0, 12))
+
+    # SERVICE URL (optional, read from `aws-ri-inventory serve` instead of AWS)
+    ttk.Label(form_frame, text='Inventory Service URL (optional, instead of credentials)', style='Field.TLabel', background='white').pack(anchor='w', pady=(0, 3))
+    service_url_entry = ttk.Entry(form_frame, style='Modern.TEntry')
+    service_url_entry.pack(fill='x')
+
+    # Status
+    status_frame = ttk.Frame(main_frame)
+    status_frame.pack(fill='x', pady=(20, 0))
+    status_frame.configure(style='White.TFrame')
+
+    progress_var = tk.StringVar(value="Ready to fetch data")
+    progress.listener = progress_events.put
+    progress_label = ttk.Label(status_frame, textvariable=progress_var, style='Subtitle.TLabel', background='white')
+    progress_label.pack(pady=(0, 8))
+
+    progress_bar = ttk.Progressbar(status_frame, mode='determinate', style='Modern.Horizontal.TProgressbar')
+    progress_bar.pack(fill='x')
+
+    # Buttons
+    button_frame = ttk.Frame(main_frame)
+    button_frame.pack(pady=(25, 10))
+    button_frame.configure(style='White.TFrame')
+
+    button_OK = ttk.Button(
+        button_frame, 
+        text="Fetch Data", 
+        command=get_aws_auth_parms,
+        style='Primary.TButton',
+        width=12
+    )
+    button_OK.pack(side='left', padx=(0, 10))
+
+    button_Cancel = ttk.Button(
+        button_frame, 
+        text="Cancel", 
+        command=cancel_fetch,
+        style='Secondary.TButton',
+        width=10
+    )
+    button_Cancel.pack(side='left')
+
+    # Show the last snapshot straight away; "Fetch Data" only refreshes stale sources
+    try:
+        last_inventory = load_last_inventory()
+    except Exception as e:
+        last_inventory = None
+        print(f"Could not read snapshot store: {e}")
+
+    if last_inventory is not None and not last_inventory[1].empty:
+        last_fetched_at, df_results = last_inventory
+        progress_var.set(f"Showing snapshot from {last_fetched_at.astimezone():%Y-%m-%d %H:%M}")
+        mainApp.after(100, show_results_window)
+
+    mainApp.after(PROGRESS_POLL_MS, poll_progress)
+
+    print("Starting application...")
+    mainApp.mainloop()
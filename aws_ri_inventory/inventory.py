@@ -0,0 +1,670 @@
+"""Fetching, caching and merging of Reserved Instance data.
+
+Nothing in this module imports tkinter, so it can be used from the
+headless command line as well as from the desktop application.
+"""
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+import boto3
+import botocore.session
+from botocore.credentials import RefreshableCredentials
+import pandas as pd
+import functools as ft
+import operator
+import sys
+import io
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import closing
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from aws_ri_inventory import progress
+from aws_ri_inventory.clients import create_client, iter_pages
+from aws_ri_inventory.tracing import clear_trace, span, traced
+from aws_ri_inventory.merge import join_ri_util_listings
+from aws_ri_inventory.schema import apply_schema
+from aws_ri_inventory.utilization import update_utilization_history, utilization_rollups
+
+# Region fan-out settings
+MAX_REGION_WORKERS = 8
+REGION_DISCOVERY_REGION = "us-east-1"
+FALLBACK_REGIONS = ["ca-central-1", "eu-west-1", "us-west-2", "ap-northeast-1"]
+
+# Multi-account settings: one shared pool for every account, with a cap on
+# the calls in flight against any single account
+MAX_ACCOUNT_WORKERS = 32
+MAX_CALLS_PER_ACCOUNT = 4
+ASSUME_ROLE_SESSION_NAME = "aws-ri-inventory"
+
+# Number of records turned into a DataFrame at a time while streaming pages
+RECORD_BATCH_SIZE = 1000
+
+# Local snapshot store. Each (account, source, region) is cached separately, as
+# a JSON Table Schema document, and is only fetched again once it is older than
+# its source's TTL.
+SNAPSHOT_DB = os.path.join(os.path.expanduser("~"), ".aws-ri-inventory", "snapshots.sqlite3")
+SNAPSHOT_TTLS = {
+    "Regions": timedelta(days=7),
+    "RI Inventory": timedelta(hours=24),
+    "RI Listings": timedelta(hours=1),
+    "RI Utilization": timedelta(hours=12),
+}
+# (source, region) of the last merged inventory, stored under the accounts it was fetched for
+LAST_INVENTORY_SNAPSHOT = ("Inventory", "global")
+
+# Least time between two partial inventories handed to on_partial while sources are still arriving
+PARTIAL_RESULTS_SECONDS = 1.0
+
+# Errors collected during the last fetch, as (stage, region, message) tuples
+fetch_errors = []
+
+# The session of the last credentials entered, and the assumed role sessions of
+# each base session, reused across refreshes: {base_session: {(account_id, role_name): session}}
+aws_sessions = {}
+role_sessions = weakref.WeakKeyDictionary()
+aws_sessions_guard = threading.Lock()
+
+def report_progress(message, **fields):
+    """Print message and send it as a progress event, with fields saying how far the fetch is"""
+    progress.report(f"{message}...", **fields)
+    print(message, file=sys.stderr)
+
+def create_aws_session(input_access_key_id, input_secret_access_key, input_session_token):
+    """Return the session for these credentials, reusing the last one while they stay the same.
+
+    Keeping the session keeps its pooled clients and their open connections,
+    so a refresh with the same credentials does not build them again.
+    """
+    credentials = (input_access_key_id, input_secret_access_key, input_session_token)
+    with aws_sessions_guard:
+        if credentials not in aws_sessions:
+            aws_sessions.clear()
+            aws_sessions[credentials] = boto3.Session(
+                aws_access_key_id=input_access_key_id,
+                aws_secret_access_key=input_secret_access_key,
+                aws_session_token=input_session_token
+            )
+        return aws_sessions[credentials]
+
+def assume_role_session(base_session, account_id, role_name):
+    """Return a session for role_name in account_id, assumed through STS with base_session.
+
+    The session is kept for later refreshes through base_session, and assumes
+    the role again by itself shortly before its credentials expire.
+    """
+    with aws_sessions_guard:
+        account_sessions = role_sessions.setdefault(base_session, {})
+        if (account_id, role_name) in account_sessions:
+            return account_sessions[(account_id, role_name)]
+
+    def assume_role():
+        sts_client = create_client(base_session, "sts")
+        assume_role_response = sts_client.assume_role(
+            RoleArn=f"arn:aws:iam::{account_id}:role/{role_name}",
+            RoleSessionName=ASSUME_ROLE_SESSION_NAME
+        )
+        credentials = assume_role_response["Credentials"]
+        return {
+            "access_key": credentials["AccessKeyId"],
+            "secret_key": credentials["SecretAccessKey"],
+            "token": credentials["SessionToken"],
+            "expiry_time": credentials["Expiration"].isoformat(),
+        }
+
+    # Share the base session's loader so service models are parsed once, not once per account
+    account_botocore_session = botocore.session.Session()
+    account_botocore_session.register_component("data_loader", base_session._session.get_component("data_loader"))
+    account_botocore_session._credentials = RefreshableCredentials.create_from_metadata(
+        assume_role(), assume_role, "sts-assume-role"
+    )
+    account_session = boto3.Session(botocore_session=account_botocore_session)
+    with aws_sessions_guard:
+        return account_sessions.setdefault((account_id, role_name), account_session)
+
+def get_account_id(session):
+    sts_client = create_client(session, "sts")
+    return sts_client.get_caller_identity()["Account"]
+
+def discover_regions(session):
+    ec2_client = create_client(session, "ec2", region_name=REGION_DISCOVERY_REGION)
+    regions_response = ec2_client.describe_regions()
+    return sorted(region["RegionName"] for region in regions_response["Regions"])
+
+def connect_snapshot_db(path=None):
+    if path is None:
+        path = SNAPSHOT_DB
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS snapshots ("
+        " account_id TEXT NOT NULL,"
+        " source TEXT NOT NULL,"
+        " region TEXT NOT NULL,"
+        " fetched_at TEXT NOT NULL,"
+        " data BLOB NOT NULL,"
+        " PRIMARY KEY (account_id, source, region))"
+    )
+    return conn
+
+def encode_snapshot(df):
+    return df.to_json(orient="table", index=False, date_unit="ns")
+
+def decode_snapshot(data):
+    return pd.read_json(io.StringIO(data), orient="table")
+
+def inventory_snapshot_account(account_ids):
+    """Return the account key the merged inventory of account_ids is stored under"""
+    return ",".join(sorted(account_ids))
+
+def save_snapshot(account_id, source, region, df, path=None):
+    fetched_at = datetime.now(timezone.utc)
+    with span("Save Snapshot", account=account_id, source=source, region=region), closing(connect_snapshot_db(path)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+            (account_id, source, region, fetched_at.isoformat(), encode_snapshot(df))
+        )
+    return fetched_at
+
+def load_snapshots(account_id, path=None):
+    """Return {(source, region): (fetched_at, df)} for every snapshot stored for the account.
+
+    A snapshot that cannot be read, e.g. one written in an older format, is
+    left out, so its source counts as stale and is fetched again.
+    """
+    with span("Load Snapshots", account=account_id), closing(connect_snapshot_db(path)) as conn:
+        rows = conn.execute(
+            "SELECT source, region, fetched_at, data FROM snapshots WHERE account_id = ?",
+            (account_id,)
+        ).fetchall()
+
+    snapshots = {}
+    for source, region, fetched_at, data in rows:
+        try:
+            snapshots[(source, region)] = (datetime.fromisoformat(fetched_at), decode_snapshot(data))
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot {source} {region} ({account_id}): {e}", file=sys.stderr)
+    return snapshots
+
+def load_last_inventory(account_ids=None, path=None):
+    """Return (fetched_at, df) for the last merged inventory of account_ids, or None if there is none.
+
+    Without account_ids, the most recent inventory of any accounts is returned.
+    """
+    source, region = LAST_INVENTORY_SNAPSHOT
+    query = "SELECT account_id, fetched_at, data FROM snapshots WHERE source = ? AND region = ?"
+    params = [source, region]
+    if account_ids is not None:
+        query += " AND account_id = ?"
+        params.append(inventory_snapshot_account(account_ids))
+    query += " ORDER BY fetched_at DESC"
+
+    with span("Load Snapshots", source=source), closing(connect_snapshot_db(path)) as conn:
+        rows = conn.execute(query, params).fetchall()
+    for account_id, fetched_at, data in rows:
+        try:
+            df_inventory = decode_snapshot(data)
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot {source} ({account_id}): {e}", file=sys.stderr)
+            continue
+        # Typed again in case the schema changed since the snapshot was saved
+        return datetime.fromisoformat(fetched_at), apply_schema(df_inventory)
+    return None
+
+def is_snapshot_fresh(snapshots, source, region, now=None):
+    if (source, region) not in snapshots:
+        return False
+    if now is None:
+        now = datetime.now(timezone.utc)
+    fetched_at, _ = snapshots[(source, region)]
+    return now - fetched_at < SNAPSHOT_TTLS[source]
+
+def field_getter(path):
+    """Return a function reading the value at a key path such as ("PriceSchedules", 0, "Term")"""
+    if len(path) == 1:
+        return operator.itemgetter(path[0])
+
+    def get_field(record):
+        for key in path:
+            record = record[key]
+        return record
+    return get_field
+
+def iter_record_chunks(record_pages, batch_size):
+    """Re-slice pages of records into chunks that never cross a batch_size boundary"""
+    remaining = batch_size
+    for page in record_pages:
+        start = 0
+        while start < len(page):
+            chunk = page[start:start + remaining]
+            start += len(chunk)
+            remaining -= len(chunk)
+            yield chunk, remaining == 0
+            if remaining == 0:
+                remaining = batch_size
+
+def build_dataframe(record_pages, fields, finalize=None, batch_size=None):
+    """Build a DataFrame from pages of raw API records, one fixed-size batch at a time.
+
+    fields maps each output column to the key path of its value in a record.
+    Values are collected column by column into plain lists and only become a
+    DataFrame once per batch, where finalize(frame) converts types and adds
+    columns vectorized.
+    """
+    if batch_size is None:
+        batch_size = RECORD_BATCH_SIZE
+
+    getters = {column: field_getter(path) for column, path in fields.items()}
+    columns = {column: [] for column in fields}
+    frames = []
+
+    def flush():
+        frame = pd.DataFrame(columns)
+        if finalize:
+            frame = finalize(frame)
+        frames.append(frame)
+
+    for chunk, batch_full in iter_record_chunks(record_pages, batch_size):
+        for column, getter in getters.items():
+            columns[column].extend([getter(record) for record in chunk])
+        if batch_full:
+            flush()
+            columns = {column: [] for column in fields}
+
+    if columns and any(columns.values()):
+        flush()
+    return concat_frames(frames)
+
+def concat_frames(frames):
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+def fetch_region_frame(session, region, fetch_region_source):
+    ec2_client = create_client(session, "ec2", region_name=region)
+    return fetch_region_source(ec2_client, region)
+
+RI_FIELDS = {
+    "ReservedInstancesId": ("ReservedInstancesId",),
+    "Start": ("Start",),
+    "End": ("End",),
+    "State": ("State",),
+    "InstanceType": ("InstanceType",),
+}
+
+RI_LISTING_FIELDS = {
+    "ClientToken": ("ClientToken",),
+    "ReservedInstancesListingId": ("ReservedInstancesListingId",),
+    "ReservedInstancesId": ("ReservedInstancesId",),
+    "ListingCreateDate": ("CreateDate",),
+    "Term": ("PriceSchedules", 0, "Term"),
+    "ListingStatus": ("Status",),
+    "ListingUpdateDate": ("UpdateDate",),
+}
+
+RI_UTILIZATION_FIELDS = {
+    "ReservedInstancesId": ("Attributes", "reservationARN"),
+    "SubscriptionStatus": ("Attributes", "subscriptionStatus"),
+    "TotalAssetValue": ("Attributes", "totalAssetValue"),
+    "StartDateTime": ("Attributes", "startDateTime"),
+    "EndDateTime": ("Attributes", "endDateTime"),
+    "UtilizationPercentage": ("Utilization", "UtilizationPercentage"),
+    "UnusedHours": ("Utilization", "UnusedHours"),
+    "NetRISavings": ("Utilization", "NetRISavings"),
+}
+
+def finalize_ris(frame, region):
+    frame["Start"] = pd.to_datetime(frame["Start"], utc=True)
+    frame["End"] = pd.to_datetime(frame["End"], utc=True)
+    frame.insert(frame.columns.get_loc("State") + 1, "Region", region)
+    return frame
+
+def finalize_ri_listings(frame):
+    frame["ListingCreateDate"] = pd.to_datetime(frame["ListingCreateDate"], utc=True)
+    frame["ListingUpdateDate"] = pd.to_datetime(frame["ListingUpdateDate"], utc=True)
+    return frame
+
+def finalize_ri_utilization(frame):
+    # The RI ID is the resource part of the reservation ARN
+    frame["ReservedInstancesId"] = frame["ReservedInstancesId"].str.split("/", n=1).str[1]
+    frame["StartDateTime"] = pd.to_datetime(frame["StartDateTime"], utc=True, errors="coerce")
+    frame["EndDateTime"] = pd.to_datetime(frame["EndDateTime"], utc=True, errors="coerce")
+    return frame
+
+def fetch_region_ris(ec2_client, region):
+    pages = (page["ReservedInstances"] for page in iter_pages(ec2_client, "describe_reserved_instances"))
+    return build_dataframe(pages, RI_FIELDS, ft.partial(finalize_ris, region=region))
+
+def fetch_region_ri_listings(ec2_client, region):
+    pages = (page["ReservedInstancesListings"] for page in iter_pages(ec2_client, "describe_reserved_instances_listings"))
+    return build_dataframe(pages, RI_LISTING_FIELDS, finalize_ri_listings)
+
+def iter_ri_utilization_groups(ce_client, start_date, end_date):
+    pages = iter_pages(
+        ce_client,
+        "get_reservation_utilization",
+        TimePeriod={
+            "Start": start_date.strftime("%Y-%m-%d"),
+            "End": end_date.strftime("%Y-%m-%d")
+        },
+        GroupBy=[
+            {
+                "Type": "DIMENSION",
+                "Key": "SUBSCRIPTION_ID"
+            }
+        ]
+    )
+    for page in pages:
+        for utilization_by_time in page["UtilizationsByTime"]:
+            yield utilization_by_time["Groups"]
+
+def fetch_ri_utilization_frame(session):
+    ri_util_end_dt = datetime.today().date()
+    ri_util_start_dt = ri_util_end_dt - timedelta(days=30)
+
+    ce_client = create_client(session, "ce")
+    groups = iter_ri_utilization_groups(ce_client, ri_util_start_dt, ri_util_end_dt)
+    return build_dataframe(groups, RI_UTILIZATION_FIELDS, finalize_ri_utilization)
+
+def fetch_utilization_history_frame(session, account_id, snapshot_path=None):
+    """Bring the account's daily utilization history up to date and return its rollups"""
+    if snapshot_path is None:
+        snapshot_path = SNAPSHOT_DB
+    ce_client = create_client(session, "ce")
+    update_utilization_history(ce_client, account_id, snapshot_path)
+    return utilization_rollups(account_id, snapshot_path)
+
+def run_throttled(tasks_by_account, max_workers=None, calls_per_account=None):
+    """Run every account's (key, fn) tasks on one shared thread pool.
+
+    At most calls_per_account tasks of any one account are submitted at a time,
+    and accounts are filled round robin so a large account cannot starve the
+    others. Yields (account_id, key, future) as tasks complete. Tasks run under
+    the caller's CancelToken, and no more are submitted once it is cancelled.
+    """
+    if max_workers is None:
+        max_workers = MAX_ACCOUNT_WORKERS
+    if calls_per_account is None:
+        calls_per_account = MAX_CALLS_PER_ACCOUNT
+
+    token = progress.current_token()
+    pending = {account_id: deque(tasks) for account_id, tasks in tasks_by_account.items()}
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next(account_id):
+            key, fn = pending[account_id].popleft()
+            in_flight[executor.submit(progress.bind(fn))] = (account_id, key)
+
+        for _ in range(calls_per_account):
+            for account_id in pending:
+                if pending[account_id]:
+                    submit_next(account_id)
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                account_id, key = in_flight.pop(future)
+                if pending[account_id] and not token.cancelled:
+                    submit_next(account_id)
+                yield account_id, key, future
+
+def merge_sources(account_ids, account_regions, snapshots, stage="Merge"):
+    """Merge each account's source frames and return one typed inventory with an AccountId column.
+
+    snapshots holds {account_id: {(source, region): (fetched_at, df)}}, and an
+    account whose regions are None (it could not be opened) is left out.
+    """
+    account_frames = []
+    for account_id in account_ids:
+        progress.check_cancelled()
+        if account_regions[account_id] is None:
+            continue
+        source_frames = {"RI Inventory": [], "RI Listings": [], "RI Utilization": []}
+        for (source, region), (_, df_source) in snapshots[account_id].items():
+            if source == "RI Utilization" or (source in source_frames and region in account_regions[account_id]):
+                source_frames[source].append(df_source)
+
+        with span(stage, account=account_id) as merge_args:
+            df_account = merge_inventory(
+                concat_frames(source_frames["RI Inventory"]),
+                concat_frames(source_frames["RI Listings"]),
+                concat_frames(source_frames["RI Utilization"])
+            )
+            merge_args["rows"] = len(df_account)
+        if df_account.empty:
+            continue
+        df_account.insert(0, "AccountId", account_id)
+        account_frames.append(df_account)
+
+    # Typed once the accounts are combined, so categoricals share one set of categories
+    return apply_schema(concat_frames(account_frames))
+
+def get_inventory(account_ids, open_account, regions=None, max_workers=None,
+                  calls_per_account=None, use_snapshots=True, snapshot_path=None, on_partial=None):
+    """Fetch and merge the RI inventory of every account, adding an AccountId column.
+
+    open_account(account_id) returns the session to use for an account. Sources
+    whose snapshot is still within its TTL are read from the snapshot store, and
+    an account is only opened when at least one of its sources is stale. All
+    remaining RI, listing and utilization calls share one bounded worker pool.
+
+    Each opened account and each fetched source is reported as a progress event
+    with done and total counts. If the fetch's CancelToken is cancelled, the
+    tasks in flight stop at their next AWS call and FetchCancelled is raised.
+
+    on_partial, if given, is called on the calling thread with the inventory
+    merged from the sources fetched so far (and the snapshots of the others),
+    as soon as some RIs are known, then whenever a source is done in every
+    region and at most every PARTIAL_RESULTS_SECONDS in between.
+    """
+    snapshots = {}
+    for account_id in account_ids:
+        snapshots[account_id] = load_snapshots(account_id, snapshot_path) if use_snapshots else {}
+
+    def snapshot_regions(account_id):
+        if regions is not None:
+            return regions
+        if is_snapshot_fresh(snapshots[account_id], "Regions", "global"):
+            return list(snapshots[account_id][("Regions", "global")][1]["RegionName"])
+        return None
+
+    def stale_sources(account_id, account_regions):
+        # Utilization takes the most calls, so it starts first; the RIs of every
+        # region come before their listings, so partial results show them early
+        stale = []
+        if not is_snapshot_fresh(snapshots[account_id], "RI Utilization", "global"):
+            stale.append(("RI Utilization", "global"))
+        for source in ("RI Inventory", "RI Listings"):
+            for region in account_regions:
+                if not is_snapshot_fresh(snapshots[account_id], source, region):
+                    stale.append((source, region))
+        return stale
+
+    def open_account_regions(account_id):
+        account_session = open_account(account_id)
+        account_regions = snapshot_regions(account_id)
+        if account_regions is not None:
+            return account_session, account_regions, False
+        try:
+            return account_session, discover_regions(account_session), True
+        except Exception as e:
+            fetch_errors.append((f"Regions ({account_id})", REGION_DISCOVERY_REGION, str(e)))
+            return account_session, list(FALLBACK_REGIONS), False
+
+    account_regions = {}
+    accounts_to_open = []
+    for account_id in account_ids:
+        account_regions[account_id] = snapshot_regions(account_id)
+        if account_regions[account_id] is None or stale_sources(account_id, account_regions[account_id]):
+            accounts_to_open.append(account_id)
+
+    open_started = time.monotonic()
+    report_progress(
+        f"Opening {len(accounts_to_open)} of {len(account_ids)} account(s)",
+        done=0, total=len(accounts_to_open), started=open_started
+    )
+
+    account_sessions = {}
+    open_tasks = {
+        account_id: [("Open Account", traced("Open Account", ft.partial(open_account_regions, account_id), account=account_id))]
+        for account_id in accounts_to_open
+    }
+    for done, (account_id, stage, future) in enumerate(run_throttled(open_tasks, max_workers, 1), 1):
+        progress.report(
+            f"{stage} {account_id}",
+            stage=stage, account=account_id, done=done, total=len(accounts_to_open), started=open_started
+        )
+        try:
+            account_session, account_regions[account_id], discovered = future.result()
+        except progress.FetchCancelled:
+            continue
+        except Exception as e:
+            fetch_errors.append((f"{stage} ({account_id})", "global", str(e)))
+            continue
+        account_sessions[account_id] = account_session
+        if discovered and use_snapshots:
+            df_regions = pd.DataFrame({"RegionName": account_regions[account_id]})
+            save_snapshot(account_id, "Regions", "global", df_regions, snapshot_path)
+    progress.check_cancelled()
+
+    fetch_tasks = {}
+    for account_id, account_session in account_sessions.items():
+        account_tasks = []
+        for source, region in stale_sources(account_id, account_regions[account_id]):
+            if source == "RI Utilization" and use_snapshots:
+                fetch = ft.partial(fetch_utilization_history_frame, account_session, account_id, snapshot_path)
+            elif source == "RI Utilization":
+                fetch = ft.partial(fetch_ri_utilization_frame, account_session)
+            elif source == "RI Inventory":
+                fetch = ft.partial(fetch_region_frame, account_session, region, fetch_region_ris)
+            else:
+                fetch = ft.partial(fetch_region_frame, account_session, region, fetch_region_ri_listings)
+            account_tasks.append(((source, region), traced(source, fetch, region=region, account=account_id)))
+        fetch_tasks[account_id] = account_tasks
+
+    task_count = sum(len(tasks) for tasks in fetch_tasks.values())
+    fetch_started = time.monotonic()
+    report_progress(
+        f"Getting {task_count} stale source(s) for {len(fetch_tasks)} account(s)",
+        done=0, total=task_count, started=fetch_started
+    )
+
+    def has_ris():
+        return any(source == "RI Inventory" for account_id in account_ids for source, _ in snapshots[account_id])
+
+    # Sources still being fetched in some region, and whether data arrived since the last partial inventory
+    pending_sources = Counter(source for tasks in fetch_tasks.values() for (source, _), _ in tasks)
+    next_partial = None
+    unshown = False
+    for done, (account_id, (source, region), future) in enumerate(run_throttled(fetch_tasks, max_workers, calls_per_account), 1):
+        progress.report(
+            f"{source} {region} ({account_id})",
+            stage=source, region=region, account=account_id, done=done, total=task_count, started=fetch_started
+        )
+        pending_sources[source] -= 1
+        try:
+            df_source = future.result()
+        except progress.FetchCancelled:
+            continue
+        except Exception as e:
+            # Keep serving the stale snapshot, if any, rather than dropping the region
+            fetch_errors.append((f"{source} ({account_id})", region, str(e)))
+        else:
+            if use_snapshots:
+                fetched_at = save_snapshot(account_id, source, region, df_source, snapshot_path)
+            else:
+                fetched_at = datetime.now(timezone.utc)
+            snapshots[account_id][(source, region)] = (fetched_at, df_source)
+            unshown = True
+
+        # Partial inventories come at most every PARTIAL_RESULTS_SECONDS, and whenever a source
+        # is done in every region; the last source is left to the full merge below
+        due = next_partial is None or time.monotonic() >= next_partial or not pending_sources[source]
+        if on_partial and unshown and due and done < task_count and has_ris():
+            on_partial(merge_sources(account_ids, account_regions, snapshots, stage="Partial Merge"))
+            next_partial = time.monotonic() + PARTIAL_RESULTS_SECONDS
+            unshown = False
+    progress.check_cancelled()
+
+    report_progress("Merging data")
+    return merge_sources(account_ids, account_regions, snapshots)
+
+def get_multi_account_inventory(base_session, account_ids, role_name, regions=None,
+                                max_workers=None, calls_per_account=None,
+                                assume_role=assume_role_session, use_snapshots=True, on_partial=None):
+    """Fetch the merged inventory of every account by assuming role_name with base_session"""
+    return get_inventory(
+        account_ids,
+        lambda account_id: assume_role(base_session, account_id, role_name),
+        regions=regions,
+        max_workers=max_workers,
+        calls_per_account=calls_per_account,
+        use_snapshots=use_snapshots,
+        on_partial=on_partial
+    )
+
+def get_account_inventory(session, regions=None, max_workers=None, use_snapshots=True, on_partial=None, account_id=None):
+    """Fetch the merged inventory of the account the session belongs to, looked up unless account_id is given"""
+    if max_workers is None:
+        max_workers = MAX_REGION_WORKERS
+    if account_id is None:
+        account_id = get_account_id(session)
+    return get_inventory(
+        [account_id],
+        lambda account_id: session,
+        regions=regions,
+        max_workers=max_workers,
+        calls_per_account=max_workers,
+        use_snapshots=use_snapshots,
+        on_partial=on_partial
+    )
+
+def merge_inventory(df_ris, df_ri_listings, df_ri_utilization):
+    if df_ris.empty and df_ri_listings.empty and df_ri_utilization.empty:
+        return pd.DataFrame()
+    return join_ri_util_listings(df_ris, df_ri_utilization, df_ri_listings)
+
+def fetch_inventory(session, account_ids=None, role_name=None, regions=None,
+                    max_workers=None, use_snapshots=True, on_partial=None):
+    """Fetch the merged inventory for the session's account, or for account_ids through role_name.
+
+    fetch_errors is reset first, and the result is stored as the last inventory
+    snapshot of these accounts so the desktop app can show it on its next start. Run it inside
+    progress.cancel_scope() to be able to cancel it from another thread.
+    on_partial receives partial inventories while the sources arrive, see get_inventory.
+    """
+    fetch_errors.clear()
+    clear_trace()
+
+    with span("Fetch Inventory", category="fetch") as fetch_args:
+        if account_ids:
+            df_inventory = get_multi_account_inventory(
+                session, account_ids, role_name,
+                regions=regions,
+                max_workers=max_workers,
+                use_snapshots=use_snapshots,
+                on_partial=on_partial
+            )
+        else:
+            account_ids = [get_account_id(session)]
+            df_inventory = get_account_inventory(
+                session,
+                regions=regions,
+                max_workers=max_workers,
+                use_snapshots=use_snapshots,
+                on_partial=on_partial,
+                account_id=account_ids[0]
+            )
+        fetch_args["rows"] = len(df_inventory)
+
+    if use_snapshots:
+        save_snapshot(inventory_snapshot_account(account_ids), *LAST_INVENTORY_SNAPSHOT, df_inventory)
+    return df_inventory
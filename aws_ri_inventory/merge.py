@@ -0,0 +1,57 @@
+"""Joining RI inventory, utilization and listings into one row per Reserved Instance.
+
+Every source is indexed by ReservedInstancesId and the indexes are aligned
+in a single outer join, instead of chaining pairwise merges that copy the
+whole frame each time and fan out RIs that were listed more than once.
+"""
+import pandas as pd
+
+JOIN_KEY = "ReservedInstancesId"
+
+def add_days_on_market(df_ri_listings, now):
+    """Add DaysOnMarket: calendar days from listing until it closed, or until now while active"""
+    listing_end = df_ri_listings["ListingUpdateDate"].where(df_ri_listings["ListingStatus"] != "active", now)
+    listed_days = listing_end.dt.normalize() - df_ri_listings["ListingCreateDate"].dt.normalize()
+    return df_ri_listings.assign(DaysOnMarket=listed_days.dt.days)
+
+def collapse_listings(df_ri_listings):
+    """Return one row per RI: its latest listing plus ListingCount and TotalDaysOnMarket"""
+    df_sorted = df_ri_listings.sort_values([JOIN_KEY, "ListingCreateDate"], kind="stable")
+    days_on_market = df_sorted.groupby(JOIN_KEY, sort=False)["DaysOnMarket"]
+
+    df_latest = df_sorted.drop_duplicates(JOIN_KEY, keep="last").set_index(JOIN_KEY)
+    df_latest["ListingCount"] = days_on_market.size()
+    df_latest["TotalDaysOnMarket"] = days_on_market.sum()
+    return df_latest
+
+def index_by_ri(df):
+    return df.drop_duplicates(JOIN_KEY, keep="last").set_index(JOIN_KEY)
+
+def join_ri_util_listings(df_ris, df_ri_utilization, df_ri_listings, now=None):
+    """Outer join the three sources on ReservedInstancesId, skipping empty ones.
+
+    The derived DaysOnMarket and DaysToExpiry columns are computed here, relative
+    to now, so that they stay current when the sources come from older snapshots.
+    """
+    if now is None:
+        now = pd.Timestamp.now(tz="UTC")
+
+    indexed = []
+    if not df_ris.empty:
+        indexed.append(index_by_ri(df_ris))
+    if not df_ri_utilization.empty:
+        indexed.append(index_by_ri(df_ri_utilization))
+    if not df_ri_listings.empty:
+        indexed.append(collapse_listings(add_days_on_market(df_ri_listings, now)))
+
+    if not indexed:
+        return pd.DataFrame()
+    if len(indexed) == 1:
+        df_joined = indexed[0]
+    else:
+        df_joined = pd.concat(indexed, axis=1, join="outer")
+    df_joined.index.name = JOIN_KEY
+
+    if "End" in df_joined.columns:
+        df_joined["DaysToExpiry"] = (df_joined["End"] - now).dt.days
+    return df_joined.reset_index()
@@ -0,0 +1,87 @@
+"""Progress events and cancellation for fetches running on worker threads.
+
+Fetch code calls report() from any thread. Each event is a dict handed to
+listener, which the desktop app points at a queue.Queue that its Tk thread
+drains, so nothing touches Tk from a worker.
+
+A fetch runs under a CancelToken. The token is bound to the thread that
+starts the fetch and carried to pool threads with bind(). Every AWS request
+checks it before it is sent, and retry backoff waits on it, so cancelling
+stops the whole fan-out within about one in-flight request.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Called with every progress event, from whichever thread reports it
+listener = None
+
+class FetchCancelled(Exception):
+    """Raised in the threads of a fetch once its token has been cancelled"""
+
+class CancelToken:
+    def __init__(self):
+        self.event = threading.Event()
+        self.started = time.monotonic()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def wait(self, timeout):
+        """Sleep for up to timeout seconds. Returns True if the token was cancelled meanwhile."""
+        return self.event.wait(timeout)
+
+    def check(self):
+        if self.event.is_set():
+            raise FetchCancelled("Fetch cancelled")
+
+# The token of the fetch each thread is working for
+bound_tokens = threading.local()
+NEVER_CANCELLED = CancelToken()
+
+def current_token():
+    return getattr(bound_tokens, "token", None) or NEVER_CANCELLED
+
+def check_cancelled():
+    current_token().check()
+
+@contextmanager
+def cancel_scope(token):
+    """Run the with block on behalf of the fetch that token cancels"""
+    previous = getattr(bound_tokens, "token", None)
+    bound_tokens.token = token
+    try:
+        yield token
+    finally:
+        bound_tokens.token = previous
+
+def bind(fn):
+    """Return fn wrapped to run under the calling thread's token, for work submitted to a thread pool"""
+    token = current_token()
+
+    def run_bound(*fn_args, **fn_kwargs):
+        with cancel_scope(token):
+            return fn(*fn_args, **fn_kwargs)
+    return run_bound
+
+def report(message=None, **fields):
+    """Send a progress event to the listener.
+
+    fields describe where the fetch is: stage, region, account, done and
+    total units of the stage, page... The event also carries the reporting
+    thread's token, so a listener can drop late events of a cancelled fetch.
+    """
+    if listener:
+        listener(dict(fields, message=message, token=current_token()))
+
+def eta_seconds(started, done, total, now=None):
+    """Estimate the seconds left from the rate at which done of total units completed since started"""
+    if not done or not total or done >= total:
+        return None
+    if now is None:
+        now = time.monotonic()
+    return (now - started) / done * (total - done)
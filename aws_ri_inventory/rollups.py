@@ -0,0 +1,185 @@
+"""Fleet-level rollups of the merged inventory.
+
+Every RI is reduced once to its group labels (region, instance type and
+family, state, listing status, expiry month...) and its measures. Each
+rollup keeps per-group sums and a histogram of DaysOnMarket, so reading a
+rollup never scans the inventory, and a refresh only subtracts the old and
+adds the new contributions of the RIs it changed. DaysOnMarket is counted in
+whole days, so percentiles read from the histograms are exact.
+"""
+import numpy as np
+import pandas as pd
+
+from aws_ri_inventory.merge import JOIN_KEY
+
+ROLLUP_DIMENSIONS = ("AccountId", "Region", "InstanceType", "InstanceFamily", "State", "ListingStatus", "ExpiryMonth")
+
+# Rollups computed when the inventory loads; any other combination is computed on first use
+ROLLUPS = tuple((dimension,) for dimension in ROLLUP_DIMENSIONS) + (
+    ("Region", "InstanceFamily"),
+    ("Region", "InstanceFamily", "ListingStatus"),
+)
+
+# Summed per group. RIs counts the RIs, Listed the ones with an active marketplace listing.
+MEASURES = ("RIs", "Listed", "UnusedHours", "ListedUnusedHours", "NetRISavings")
+DAYS_ON_MARKET_PERCENTILES = (50, 90)
+
+# A refresh changing more than this share of the RIs rebuilds the rollups rather than patching them
+REBUILD_SHARE = 0.25
+
+# Group label of RIs without a value, e.g. the ListingStatus of RIs never listed
+NO_VALUE = "(none)"
+
+def group_labels(values, relabel=None):
+    """Return a column's values as group labels, NO_VALUE where missing.
+
+    relabel, if given, maps the Index of distinct labels to new labels, so it
+    runs once per distinct value rather than once per row.
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    categories = values.cat.categories.astype(str)
+    if relabel is not None:
+        categories = relabel(categories)
+    labels = np.append(np.asarray(categories, dtype=object), NO_VALUE)
+    return labels[values.cat.codes.to_numpy()]
+
+def rollup_rows(df):
+    """Return the group labels and measures of every RI, indexed by ReservedInstancesId"""
+    df = df.drop_duplicates(JOIN_KEY, keep="last")
+
+    def column(name):
+        if name in df.columns:
+            return df[name]
+        return pd.Series(np.nan, index=df.index)
+
+    def numbers(name):
+        return pd.to_numeric(column(name), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    end = column("End")
+    if "EndDateTime" in df.columns:
+        end = end.fillna(df["EndDateTime"])
+    end = pd.to_datetime(end, utc=True, errors="coerce").dt.tz_localize(None).dt.to_period("M")
+
+    listed = (column("ListingStatus") == "active").to_numpy(dtype=bool)
+    unused_hours = np.nan_to_num(numbers("UnusedHours"))
+    return pd.DataFrame({
+        "AccountId": group_labels(column("AccountId")),
+        "Region": group_labels(column("Region")),
+        "InstanceType": group_labels(column("InstanceType")),
+        "InstanceFamily": group_labels(column("InstanceType"), lambda types: types.str.split(".").str[0]),
+        "State": group_labels(column("State")),
+        "ListingStatus": group_labels(column("ListingStatus")),
+        "ExpiryMonth": group_labels(end),
+        "RIs": 1,
+        "Listed": listed.astype(int),
+        "UnusedHours": unused_hours,
+        "ListedUnusedHours": np.where(listed, unused_hours, 0.0),
+        "NetRISavings": np.nan_to_num(numbers("NetRISavings")),
+        "DaysOnMarket": numbers("DaysOnMarket"),
+    }, index=pd.Index(df[JOIN_KEY], name=JOIN_KEY))
+
+def group_measures(rows, dimensions):
+    """Return (totals, histogram) of rows grouped by dimensions.
+
+    totals holds the MEASURES of every group, histogram the number of RIs of
+    every (group..., DaysOnMarket).
+    """
+    dimensions = list(dimensions)
+    totals = rows.groupby(dimensions)[list(MEASURES)].sum()
+    listed = rows[rows["DaysOnMarket"].notna()]
+    histogram = listed.groupby(dimensions + ["DaysOnMarket"]).size()
+    return totals, histogram
+
+def combine(current, delta):
+    """Return current + delta, aligned by group, without the groups left at zero"""
+    if delta.empty:
+        return current
+    current = current.add(delta, fill_value=0)
+    if isinstance(current, pd.DataFrame):
+        return current[current["RIs"] != 0]
+    return current[current != 0]
+
+def histogram_percentile(histogram, dimensions, percentile):
+    """Return the nearest-rank percentile of DaysOnMarket of every group of a histogram"""
+    dimensions = list(dimensions)
+    if histogram.empty:
+        return pd.Series(dtype=float)
+    histogram = histogram.sort_index()
+    levels = list(range(len(dimensions)))
+    running = histogram.groupby(level=levels).cumsum()
+    total = histogram.groupby(level=levels).transform("sum")
+    reached = running >= np.ceil(total * percentile / 100)
+    first = reached[reached].index.to_frame(index=False).drop_duplicates(dimensions)
+    return first.set_index(dimensions)["DaysOnMarket"]
+
+class RollupEngine:
+    """Group-by rollups of an inventory, computed once and updated with the diffs of later refreshes"""
+
+    def __init__(self, df, rollups=None):
+        if rollups is None:
+            rollups = ROLLUPS
+        self.build(df, rollups)
+
+    def build(self, df, rollups):
+        self.rows = rollup_rows(df)
+        self.totals = {}
+        self.histograms = {}
+        for dimensions in rollups:
+            self.add_rollup(dimensions)
+
+    def add_rollup(self, dimensions):
+        dimensions = tuple(dimensions)
+        self.totals[dimensions], self.histograms[dimensions] = group_measures(self.rows, dimensions)
+
+    def rollup(self, dimensions):
+        """Return one row per group of dimensions, with its MEASURES and DaysOnMarket percentiles"""
+        dimensions = tuple(dimensions)
+        if dimensions not in self.totals:
+            self.add_rollup(dimensions)
+        df_rollup = self.totals[dimensions].round(2)
+        df_rollup[["RIs", "Listed"]] = df_rollup[["RIs", "Listed"]].astype(int)
+        for percentile in DAYS_ON_MARKET_PERCENTILES:
+            days = histogram_percentile(self.histograms[dimensions], dimensions, percentile)
+            df_rollup[f"DaysOnMarketP{percentile}"] = days.reindex(df_rollup.index).astype("Int64")
+        return df_rollup.reset_index()
+
+    def overall(self):
+        """Return the MEASURES summed over the whole inventory"""
+        return self.rows[list(MEASURES)].sum().round(2)
+
+    def update(self, df_new, df_changes):
+        """Apply a refresh: df_new is the refreshed inventory and df_changes its diff from the one rolled up.
+
+        Only the RIs in df_changes are relabelled and regrouped: their old rows
+        are grouped with negated measures and their new rows as they are, so
+        every rollup is patched with one grouped delta. When more than
+        REBUILD_SHARE of the RIs changed, rebuilding is cheaper and is done instead.
+        """
+        change_ids = pd.Index(df_changes[JOIN_KEY])
+        if len(change_ids) > len(self.rows) * REBUILD_SHARE:
+            self.build(df_new, list(self.totals))
+            return
+        df_new = df_new[df_new[JOIN_KEY].isin(change_ids)]
+        new_rows = rollup_rows(df_new)
+        old_positions = self.rows.index.get_indexer(change_ids)
+        old_rows = self.rows.iloc[old_positions[old_positions >= 0]]
+
+        negated = old_rows.copy()
+        negated[list(MEASURES)] = -negated[list(MEASURES)]
+        delta_rows = pd.concat([new_rows, negated.assign(Count=-1)]).fillna({"Count": 1})
+        for dimensions in self.totals:
+            delta_totals = delta_rows.groupby(list(dimensions))[list(MEASURES)].sum()
+            listed = delta_rows[delta_rows["DaysOnMarket"].notna()]
+            delta_histogram = listed.groupby(list(dimensions) + ["DaysOnMarket"])["Count"].sum()
+            self.totals[dimensions] = combine(self.totals[dimensions], delta_totals)
+            self.histograms[dimensions] = combine(self.histograms[dimensions], delta_histogram)
+
+        kept = new_rows.index.isin(old_rows.index)
+        if kept.any():
+            self.rows.iloc[self.rows.index.get_indexer(new_rows.index[kept])] = new_rows[kept]
+        gone = old_rows.index.difference(new_rows.index)
+        if len(gone):
+            self.rows = self.rows.drop(gone)
+        if not kept.all():
+            self.rows = pd.concat([self.rows, new_rows[~kept]])
@@ -0,0 +1,62 @@
+"""Column types of the merged inventory.
+
+Low-cardinality text such as State or Region is stored as categoricals, the
+Cost Explorer numbers (which the API returns as strings) as floats, counts of
+days and listings as nullable integers and dates as UTC datetime64. Missing
+values stay missing: the results table renders them blank when it builds its
+display strings, so no filled copy of the frame is ever made.
+"""
+import re
+
+import pandas as pd
+
+CATEGORY_COLUMNS = ("AccountId", "State", "Region", "InstanceType", "SubscriptionStatus", "ListingStatus")
+FLOAT_COLUMNS = ("TotalAssetValue", "UtilizationPercentage", "UnusedHours", "NetRISavings")
+INTEGER_COLUMNS = ("Term", "DaysOnMarket", "ListingCount", "TotalDaysOnMarket", "DaysToExpiry")
+DATE_COLUMNS = ("Start", "End", "StartDateTime", "EndDateTime", "ListingCreateDate", "ListingUpdateDate")
+
+# Dates are kept as datetime64 and only formatted like this for display and export
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# The utilization windows of the daily history, e.g. Utilization90d and UnusedHours90d
+WINDOW_FLOAT_COLUMN = re.compile(r"(Utilization|UnusedHours)\d+d")
+
+def column_kind(column):
+    """Return "category", "float", "integer" or "date" for a known column, None for any other"""
+    if column in CATEGORY_COLUMNS:
+        return "category"
+    if column in FLOAT_COLUMNS or WINDOW_FLOAT_COLUMN.fullmatch(column):
+        return "float"
+    if column in INTEGER_COLUMNS:
+        return "integer"
+    if column in DATE_COLUMNS:
+        return "date"
+    return None
+
+def convert_column(values, kind):
+    if kind == "category":
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values
+        return values.astype("category")
+    if kind == "float":
+        if pd.api.types.is_float_dtype(values.dtype):
+            return values
+        return pd.to_numeric(values, errors="coerce").astype("float64")
+    if kind == "integer":
+        if isinstance(values.dtype, pd.Int64Dtype):
+            return values
+        return pd.to_numeric(values, errors="coerce").round().astype("Int64")
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    return pd.to_datetime(values, utc=True, errors="coerce")
+
+def apply_schema(df):
+    """Return df with every known column converted to its schema type. Other columns are kept as they are."""
+    converted = {}
+    for column in df.columns:
+        kind = column_kind(column)
+        if kind is not None:
+            converted[column] = convert_column(df[column], kind)
+    if not converted:
+        return df
+    return df.assign(**converted)
@@ -0,0 +1,307 @@
+"""Service mode: fetch the inventory on a schedule and serve it over a local HTTP/JSON API.
+
+One process refreshes the merged inventory every SERVICE_REFRESH_MINUTES
+with the usual fetch and snapshot code, and any number of readers (the
+desktop app, scripts, dashboards) query it instead of calling AWS. The
+last inventory is kept in the snapshot store as well, so a restarted
+service answers straight away.
+
+GET /inventory returns rows of the inventory as JSON:
+    q=TEXT              rows containing TEXT in any cell, ignoring case
+    COLUMN=VALUE        rows whose COLUMN is shown as VALUE, e.g. State=active
+    sort=COLUMN         sort by COLUMN, with order=asc (the default) or desc
+    offset=N, limit=N   page through the rows (limit defaults to SERVICE_PAGE_SIZE)
+GET /status returns when the inventory was fetched, its size and the errors
+of that fetch.
+
+Inventory responses carry an ETag made of the inventory version and the
+query. A client that sends it back in If-None-Match gets 304 Not Modified,
+without the query being run, until a refresh changes the inventory.
+"""
+import hashlib
+import json
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from urllib.request import Request, urlopen
+
+import numpy as np
+import pandas as pd
+
+from aws_ri_inventory import inventory
+from aws_ri_inventory import progress
+from aws_ri_inventory.schema import apply_schema
+from aws_ri_inventory.table import (
+    build_search_index,
+    column_sort_order,
+    search_positions,
+    sort_positions,
+    stringify_columns,
+)
+from aws_ri_inventory.tracing import clear_trace, span
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8642
+SERVICE_REFRESH_MINUTES = 60
+
+# Rows per /inventory response when no limit is given, and the largest limit accepted
+SERVICE_PAGE_SIZE = 1000
+SERVICE_MAX_PAGE_SIZE = 50000
+
+# Rows the desktop app asks for at a time when it reads from a service
+CLIENT_PAGE_SIZE = 10000
+CLIENT_TIMEOUT_SECONDS = 60
+
+# /inventory parameters that are not column filters
+QUERY_PARAMETERS = ("q", "sort", "order", "offset", "limit")
+
+# The inventory being served, replaced as a whole by every refresh
+current_view = None
+
+# The first page and inventory last read from each service: {url: (etag, df)}
+service_reads = {}
+
+class InventoryView:
+    """A fetched inventory with the display strings, search index and sort orders queries run on"""
+
+    def __init__(self, df, fetched_at, errors=()):
+        self.df = df.reset_index(drop=True)
+        self.fetched_at = fetched_at
+        self.errors = [list(error) for error in errors]
+        self.version = hashlib.sha1(f"{fetched_at.isoformat()}/{len(df)}".encode()).hexdigest()[:16]
+        self.display_columns = stringify_columns(self.df)
+        self.search_index = build_search_index(zip(*self.display_columns.values()))
+        self.sort_orders = {}
+        self.sort_orders_lock = threading.Lock()
+
+    def sort_order(self, column):
+        with self.sort_orders_lock:
+            if column not in self.sort_orders:
+                self.sort_orders[column] = column_sort_order(self.df[column])
+            return self.sort_orders[column]
+
+    def etag(self, params):
+        query = urlencode(sorted(params.items()))
+        return f'"{self.version}-{hashlib.sha1(query.encode()).hexdigest()[:12]}"'
+
+    def query(self, params):
+        """Return the row positions matching params, in order. Raises ValueError for unknown columns or orders."""
+        positions = np.arange(len(self.df))
+        for column, value in params.items():
+            if column in QUERY_PARAMETERS:
+                continue
+            if column not in self.display_columns:
+                raise ValueError(f"Unknown column {column}")
+            positions = positions[self.display_columns[column][positions] == value]
+
+        search_text = params.get("q", "").lower()
+        if search_text:
+            positions = search_positions(self.search_index, positions, search_text)
+
+        column = params.get("sort")
+        if column:
+            if column not in self.display_columns:
+                raise ValueError(f"Unknown sort column {column}")
+            order = self.sort_order(column)
+            direction = params.get("order", "asc")
+            if direction not in ("asc", "desc"):
+                raise ValueError("order must be asc or desc")
+            positions = sort_positions(order[::-1] if direction == "desc" else order, positions)
+        return positions
+
+    def page_body(self, positions, offset, limit):
+        page = self.df.iloc[positions[offset:offset + limit]]
+        rows = page.to_json(orient="values", date_format="iso", date_unit="s") if len(page) else "[]"
+        header = json.dumps({
+            "version": self.version,
+            "fetched_at": self.fetched_at.isoformat(),
+            "total": len(positions),
+            "offset": offset,
+            "limit": limit,
+            "columns": list(self.df.columns),
+        })
+        # The rows are serialized by pandas and spliced in rather than re-encoded
+        return f'{header[:-1]}, "rows": {rows}}}'
+
+    def status(self):
+        return {
+            "version": self.version,
+            "fetched_at": self.fetched_at.isoformat(),
+            "rows": len(self.df),
+            "errors": self.errors,
+        }
+
+def page_bounds(params):
+    try:
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", SERVICE_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0 or not 0 < limit <= SERVICE_MAX_PAGE_SIZE:
+        raise ValueError(f"offset must be 0 or more and limit between 1 and {SERVICE_MAX_PAGE_SIZE}")
+    return offset, limit
+
+class InventoryRequestHandler(BaseHTTPRequestHandler):
+    server_version = "aws-ri-inventory"
+
+    def send_body(self, status, body, etag=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_body(self, status, message):
+        self.send_body(status, json.dumps({"error": message}))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        view = current_view
+        if url.path not in ("/inventory", "/status"):
+            return self.send_error_body(404, f"No such path {url.path}, use /inventory or /status")
+        if view is None:
+            return self.send_error_body(503, "The first fetch has not finished yet")
+        if url.path == "/status":
+            return self.send_body(200, json.dumps(view.status()))
+
+        etag = view.etag(params)
+        if_none_match = self.headers.get("If-None-Match", "")
+        if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        try:
+            offset, limit = page_bounds(params)
+            positions = view.query(params)
+        except ValueError as e:
+            return self.send_error_body(400, str(e))
+        self.send_body(200, view.page_body(positions, offset, limit), etag)
+
+def refresh_inventory(session, **fetch_args):
+    """Fetch the inventory and start serving it"""
+    global current_view
+    df_inventory = inventory.fetch_inventory(session, **fetch_args)
+    current_view = InventoryView(df_inventory, datetime.now(timezone.utc), inventory.fetch_errors)
+    print(f"Serving {len(df_inventory)} RIs, version {current_view.version}", file=sys.stderr)
+
+def refresh_forever(session, interval_seconds, token, **fetch_args):
+    """Refresh every interval_seconds until token is cancelled. A failed refresh keeps the last inventory."""
+    with progress.cancel_scope(token):
+        while not token.cancelled:
+            try:
+                refresh_inventory(session, **fetch_args)
+            except progress.FetchCancelled:
+                return
+            except Exception as e:
+                print(f"Refresh failed, still serving the last inventory: {e}", file=sys.stderr)
+            if token.wait(interval_seconds):
+                return
+
+def run_service(session, host=None, port=None, refresh_minutes=None, use_snapshots=True, **fetch_args):
+    """Serve the inventory until interrupted, refreshing it on a background thread"""
+    global current_view
+    if host is None:
+        host = SERVICE_HOST
+    if port is None:
+        port = SERVICE_PORT
+    if refresh_minutes is None:
+        refresh_minutes = SERVICE_REFRESH_MINUTES
+
+    # Serve the last snapshot of the same accounts while the first refresh runs
+    last_inventory = None
+    if use_snapshots:
+        try:
+            account_ids = fetch_args.get("account_ids") or [inventory.get_account_id(session)]
+            last_inventory = inventory.load_last_inventory(account_ids)
+        except Exception as e:
+            print(f"Could not read the last inventory: {e}", file=sys.stderr)
+    if last_inventory is not None:
+        fetched_at, df_inventory = last_inventory
+        current_view = InventoryView(df_inventory, fetched_at)
+
+    token = progress.CancelToken()
+    refresher = threading.Thread(
+        target=refresh_forever,
+        args=(session, refresh_minutes * 60, token),
+        kwargs=dict(fetch_args, use_snapshots=use_snapshots),
+        name="refresh",
+        daemon=True
+    )
+    server = ThreadingHTTPServer((host, port), InventoryRequestHandler)
+    print(f"Serving the RI inventory on http://{host}:{server.server_port}", file=sys.stderr)
+    refresher.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        token.cancel()
+        server.server_close()
+        refresher.join()
+
+def get_json(url, etag=None):
+    """GET url and return (etag, body), or (etag, None) when the server answers 304 Not Modified"""
+    request = Request(url, headers={"If-None-Match": etag} if etag else {})
+    try:
+        with urlopen(request, timeout=CLIENT_TIMEOUT_SECONDS) as response:
+            return response.headers.get("ETag"), json.load(response)
+    except HTTPError as e:
+        if e.code == 304:
+            return etag, None
+        raise
+
+def fetch_service_inventory(url, page_size=None):
+    """Read the whole inventory from a service started with `aws-ri-inventory serve`.
+
+    Stands in for fetch_inventory: fetch_errors is set to the errors of the
+    service's last refresh. If the first page is unchanged since the last read
+    the previous inventory is returned without reading the rest. Raises
+    FetchCancelled if the fetch is cancelled between pages.
+    """
+    if page_size is None:
+        page_size = CLIENT_PAGE_SIZE
+    url = url.rstrip("/")
+    inventory.fetch_errors.clear()
+    clear_trace()
+
+    with span("Read Service", category="fetch", url=url) as read_args:
+        _, status = get_json(f"{url}/status")
+        inventory.fetch_errors.extend(tuple(error) for error in status["errors"])
+
+        last_etag, df_last = service_reads.get(url, (None, None))
+        rows = []
+        offset = 0
+        while True:
+            progress.check_cancelled()
+            page_etag, page = get_json(f"{url}/inventory?{urlencode({'offset': offset, 'limit': page_size})}",
+                                       last_etag if offset == 0 else None)
+            if page is None:
+                read_args["rows"] = len(df_last)
+                return df_last
+            if offset == 0:
+                first_etag, version, columns = page_etag, page["version"], page["columns"]
+            elif page["version"] != version:
+                # The service refreshed while we were paging, so start over on the new version
+                rows = []
+                offset = 0
+                continue
+            rows.extend(page["rows"])
+            offset += len(page["rows"])
+            progress.report(operation="inventory", region=url, page=offset // page_size)
+            if not page["rows"] or offset >= page["total"]:
+                break
+
+        df_inventory = apply_schema(pd.DataFrame(rows, columns=columns))
+        service_reads[url] = (first_etag, df_inventory)
+        read_args["rows"] = len(df_inventory)
+    return df_inventory
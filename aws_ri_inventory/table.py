@@ -0,0 +1,98 @@
+"""Display strings, search and sorting for the results table.
+
+Nothing here imports tkinter, so the same code paths can be timed by the
+benchmark and used without a display.
+"""
+import numpy as np
+import pandas as pd
+
+from aws_ri_inventory.schema import DATE_FORMAT
+
+def stringify_column(values):
+    """Return a column's display strings as an object array, with missing values blank"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Each category is formatted once; code -1 (missing) picks the blank appended last
+        categories = np.append(values.cat.categories.astype(str).to_numpy(dtype=object), '')
+        return categories[values.cat.codes.to_numpy()]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        strings = values.dt.strftime(DATE_FORMAT)
+    else:
+        strings = values.astype(str)
+    return strings.where(values.notna(), '').to_numpy(dtype=object)
+
+def stringify_columns(df):
+    """Return {column: display strings} for every column of the DataFrame"""
+    return {col: stringify_column(df[col]) for col in df.columns}
+
+def stringify_rows(df):
+    """Return the DataFrame's rows as tuples of display strings, with missing values blank"""
+    return list(zip(*stringify_columns(df).values()))
+
+def value_masks(series):
+    """Return {value: mask of the rows holding it} for every value of a column, in sorted order"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    codes = series.cat.codes.to_numpy()
+    return {str(category): codes == code for code, category in enumerate(series.cat.categories)}
+
+def build_search_index(rows):
+    """Return one lowercased string per row with its cells joined by a separator.
+
+    The separator cannot be typed in the search box, so a query never matches
+    across two cells.
+    """
+    return np.array(['\x1f'.join(row).lower() for row in rows], dtype=object)
+
+def search_positions(search_index, positions, search_text):
+    """Return the subset of positions whose search_index entry contains search_text"""
+    matches = np.fromiter(
+        (search_text in search_index[position] for position in positions),
+        dtype=bool,
+        count=len(positions)
+    )
+    return positions[matches]
+
+def refine_search(search_index, all_positions, last_text, last_positions, search_text):
+    """Return the positions matching search_text, given the positions that matched last_text.
+
+    A query that extends the last one, as typing does, only searches the
+    positions the last one matched.
+    """
+    if not search_text:
+        return all_positions
+    if search_text == last_text:
+        return last_positions
+    if search_text.startswith(last_text):
+        return search_positions(search_index, last_positions, search_text)
+    return search_positions(search_index, all_positions, search_text)
+
+def state_positions(positions, state_masks, state_value):
+    """Return the positions holding state_value, or all of them for a value without a mask such as "All" """
+    if state_value in state_masks:
+        return positions[state_masks[state_value][positions]]
+    return positions
+
+def column_sort_order(series):
+    """Return the row positions that sort a column ascending, with missing values first.
+
+    Text columns whose values are all numeric sort as numbers, other text
+    columns sort case-insensitively. Categorical columns sort by their codes,
+    whose categories are in sorted order. Other typed columns sort natively.
+    """
+    values = series.reset_index(drop=True)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Missing values have code -1, so they come first
+        values = values.cat.codes
+    elif pd.api.types.is_string_dtype(values.dtype):
+        numeric = pd.to_numeric(values, errors='coerce')
+        if numeric.notna().sum() == values.notna().sum():
+            values = numeric
+        else:
+            values = values.astype(str).str.lower().where(values.notna())
+    return values.sort_values(kind='stable', na_position='first').index.to_numpy()
+
+def sort_positions(order, positions):
+    """Return the positions that are in positions, in the order given by a column sort order"""
+    shown = np.zeros(len(order), dtype=bool)
+    shown[positions] = True
+    return order[shown[order]]
@@ -0,0 +1,199 @@
+"""Client-side rate limiting and retries for every AWS call.
+
+Each session gets one RequestLimiter per (service, region), shared by every
+client made for it, so the RI, listing and utilization stages draw from
+the same budget as the API quota they run against. A limiter hands out
+tokens at a rate that starts at the service's documented refill rate and
+caps the requests in flight. Both are halved when AWS throttles a request
+and ramp back up while requests succeed. Throttled and transient failures
+are retried with full jitter exponential backoff instead of failing the
+whole region.
+
+Waiting for the limiter and backing off both watch the fetch's CancelToken,
+so a cancelled fetch stops sending within CANCEL_CHECK_SECONDS.
+"""
+import random
+import threading
+import time
+import weakref
+
+import botocore.exceptions
+
+from aws_ri_inventory import progress, tracing
+
+# Starting (requests per second, burst) per service. EC2 describe calls refill
+# at 20 per second per account and region; Cost Explorer allows far fewer.
+SERVICE_RATES = {
+    "ec2": (20.0, 100),
+    "ce": (5.0, 5),
+    "sts": (10.0, 20),
+}
+DEFAULT_RATE = (10.0, 20)
+MIN_RATE = 0.5
+
+# Requests in flight per service and region, before any throttling
+MAX_CONCURRENT_REQUESTS = 8
+
+# Share of the starting rate regained by every successful request after a throttle
+RATE_RAMP = 0.05
+
+# Attempts per call, and the backoff cap in seconds: attempt n waits
+# uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** n))
+MAX_ATTEMPTS = 10
+# Attempts per call when the endpoint cannot be reached at all (DNS, connect
+# timeout, TLS), which backing off for minutes rarely fixes
+CONNECTION_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20.0
+
+# Longest a request waits for the limiter between checks of its fetch's CancelToken
+CANCEL_CHECK_SECONDS = 0.25
+
+THROTTLING_ERROR_CODES = {
+    "RequestLimitExceeded",
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "LimitExceededException",
+    "SlowDown",
+    "EC2ThrottledException",
+    "PriorRequestNotComplete",
+    "BandwidthLimitExceeded",
+}
+TRANSIENT_ERROR_CODES = {
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "InternalError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "Unavailable",
+}
+
+# {session: {(service, region): RequestLimiter}}
+request_limiters = weakref.WeakKeyDictionary()
+request_limiters_guard = threading.Lock()
+
+class RequestLimiter:
+    """Token bucket with an adaptive rate and an adaptive cap on requests in flight"""
+
+    def __init__(self, rate, burst, max_concurrency=None):
+        if max_concurrency is None:
+            max_concurrency = MAX_CONCURRENT_REQUESTS
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.refilled_at = time.monotonic()
+        self.condition = threading.Condition()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def acquire(self, token=None):
+        """Block until a token and a slot for one more request in flight are free.
+
+        Raises FetchCancelled, without taking anything, if token is cancelled meanwhile.
+        """
+        with self.condition:
+            while True:
+                if token is not None:
+                    token.check()
+                self.refill()
+                if self.tokens >= 1 and self.in_flight < int(self.concurrency):
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                if self.tokens < 1:
+                    self.condition.wait(min(CANCEL_CHECK_SECONDS, (1 - self.tokens) / self.rate))
+                else:
+                    self.condition.wait(CANCEL_CHECK_SECONDS)
+
+    def release(self, throttled):
+        """Free a request's slot: back off if AWS throttled it, ramp up otherwise"""
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.tokens = min(self.tokens, 0.0)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_RAMP)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self.condition.notify_all()
+
+def get_limiter(session, service_name, region_name):
+    with request_limiters_guard:
+        session_limiters = request_limiters.setdefault(session, {})
+        key = (service_name, region_name)
+        if key not in session_limiters:
+            rate, burst = SERVICE_RATES.get(service_name, DEFAULT_RATE)
+            session_limiters[key] = RequestLimiter(rate, burst)
+        return session_limiters[key]
+
+def error_code(response):
+    if response is None:
+        return None
+    http_response, parsed = response
+    code = parsed.get("Error", {}).get("Code")
+    if code is None and http_response.status_code == 429:
+        return "TooManyRequestsException"
+    return code
+
+def max_attempts(response, caught_exception):
+    """Return the attempts a request that ended this way gets in all, 1 if it is not retried.
+
+    Throttling, transient error codes, 5xx responses and connections dropped
+    mid-request get MAX_ATTEMPTS; endpoints that cannot be connected to get
+    CONNECTION_MAX_ATTEMPTS. Any other error, and success, are not retried.
+    """
+    if isinstance(caught_exception, botocore.exceptions.ConnectionError):
+        return CONNECTION_MAX_ATTEMPTS
+    if isinstance(caught_exception, botocore.exceptions.HTTPClientError):
+        return MAX_ATTEMPTS
+    if caught_exception is not None:
+        return 1
+    code = error_code(response)
+    if code in THROTTLING_ERROR_CODES or code in TRANSIENT_ERROR_CODES or response[0].status_code >= 500:
+        return MAX_ATTEMPTS
+    return 1
+
+def retry_delay(attempts):
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempts))
+
+def schedule_client(session, client):
+    """Send every request the client makes through its (service, region) limiter.
+
+    The limiter is taken before each attempt is sent and released once botocore
+    asks whether to retry it. Returning a delay from needs-retry makes botocore
+    sleep and send the request again, so the client's own retries are turned
+    off in favour of these. The backoff itself is waited out here on the
+    fetch's CancelToken, and botocore is told to retry straight away.
+    """
+    limiter = get_limiter(session, client.meta.service_model.service_name, client.meta.region_name)
+
+    def before_send(**kwargs):
+        limiter.acquire(progress.current_token())
+
+    def needs_retry(response, attempts, caught_exception, **kwargs):
+        # A request cancelled before it was sent never took a slot
+        if isinstance(caught_exception, progress.FetchCancelled):
+            return None
+        throttled = error_code(response) in THROTTLING_ERROR_CODES
+        limiter.release(throttled)
+        if throttled:
+            tracing.count("throttles")
+        if attempts >= max_attempts(response, caught_exception) or progress.current_token().wait(retry_delay(attempts)):
+            return None
+        return 0
+
+    client.meta.events.register("before-send", before_send)
+    client.meta.events.register("needs-retry", needs_retry)
+    return client
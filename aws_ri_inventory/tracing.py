@@ -0,0 +1,180 @@
+"""Wall time and AWS API call instrumentation.
+
+Stages run inside span(), which records how long they took as a complete
+event in the Trace Event Format, so a fetch can be opened in
+chrome://tracing or Perfetto. Every client made by create_client records
+its calls as "api" events as well, and counts them with their pages,
+retries and response bytes in the innermost span of the calling thread.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Completed events of the current trace, with the names of the threads they ran on
+trace_events = []
+thread_names = {}
+trace_lock = threading.Lock()
+
+# The args of the open spans of each thread, innermost last
+open_spans = threading.local()
+
+# Counters that API calls add to their span, totalled by trace_summary
+SPAN_COUNTERS = ("calls", "pages", "retries", "throttles", "bytes")
+
+def now_us():
+    return time.perf_counter_ns() // 1000
+
+def clear_trace():
+    with trace_lock:
+        trace_events.clear()
+        thread_names.clear()
+
+def record_event(name, category, started_us, ended_us, args):
+    thread = threading.current_thread()
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": started_us,
+        "dur": ended_us - started_us,
+        "pid": os.getpid(),
+        "tid": thread.ident,
+        "args": args,
+    }
+    with trace_lock:
+        thread_names[thread.ident] = thread.name
+        trace_events.append(event)
+
+def count(counter, amount=1):
+    """Add amount to a counter of the innermost open span of this thread, if any"""
+    spans = getattr(open_spans, "spans", None)
+    if spans:
+        spans[-1][counter] = spans[-1].get(counter, 0) + amount
+
+@contextmanager
+def span(name, category="stage", **args):
+    """Record the wall time of the with block as a trace event.
+
+    args are added to the event, and the block can add more to the dict it is
+    given. API calls made on this thread inside the block add calls, pages,
+    retries, throttles and bytes counters to it.
+    """
+    spans = open_spans.__dict__.setdefault("spans", [])
+    spans.append(args)
+    started_us = now_us()
+    try:
+        yield args
+    finally:
+        spans.pop()
+        record_event(name, category, started_us, now_us(), args)
+
+def traced(name, fn, **args):
+    """Return fn wrapped to run in span(name, **args), for work submitted to a thread pool"""
+    def run_traced(*fn_args, **fn_kwargs):
+        with span(name, **args):
+            return fn(*fn_args, **fn_kwargs)
+    return run_traced
+
+def start_api_call(model, context, **kwargs):
+    context["trace_call"] = f"{model.service_model.service_name}.{model.name}"
+    context["trace_started_us"] = now_us()
+
+def response_bytes(http_response):
+    content_length = http_response.headers.get("content-length")
+    if content_length is not None:
+        return int(content_length)
+    if http_response.raw is None:
+        return 0
+    return len(http_response.content)
+
+def end_api_call(http_response, parsed, model, context, **kwargs):
+    retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    size = response_bytes(http_response)
+    count("calls")
+    count("retries", retries)
+    count("bytes", size)
+    record_event(
+        f"{model.service_model.service_name}.{model.name}",
+        "api",
+        context.get("trace_started_us", now_us()),
+        now_us(),
+        {"region": context.get("client_region"), "status": http_response.status_code, "retries": retries, "bytes": size}
+    )
+
+def fail_api_call(exception, context, **kwargs):
+    count("calls")
+    record_event(
+        context.get("trace_call", "api"),
+        "api",
+        context.get("trace_started_us", now_us()),
+        now_us(),
+        {"region": context.get("client_region"), "error": str(exception)}
+    )
+
+def instrument_client(client):
+    """Record every call the client makes, including the ones that fail"""
+    client.meta.events.register("before-parameter-build", start_api_call)
+    client.meta.events.register("after-call", end_api_call)
+    client.meta.events.register("after-call-error", fail_api_call)
+    return client
+
+def trace_summary():
+    """Return {stage: totals} for the stage spans of the current trace.
+
+    Totals hold the stage's wall time from its first start to its last end,
+    its calls, pages, retries, throttles and bytes, and the same per region under
+    "regions" for the spans that ran for a single region.
+    """
+    with trace_lock:
+        events = [event for event in trace_events if event["cat"] == "stage"]
+
+    def new_totals():
+        return dict({"seconds": 0.0}, **{counter: 0 for counter in SPAN_COUNTERS})
+
+    summary = {}
+    extents = {}
+    for event in events:
+        stage = summary.setdefault(event["name"], dict(new_totals(), regions={}))
+        first_us, last_us = extents.get(event["name"], (event["ts"], event["ts"] + event["dur"]))
+        extents[event["name"]] = (min(first_us, event["ts"]), max(last_us, event["ts"] + event["dur"]))
+
+        totals = [stage]
+        region = event["args"].get("region")
+        if region is not None:
+            totals.append(stage["regions"].setdefault(region, new_totals()))
+            totals[-1]["seconds"] += event["dur"] / 1e6
+        for total in totals:
+            for counter in SPAN_COUNTERS:
+                total[counter] += event["args"].get(counter, 0)
+
+    for name, (first_us, last_us) in extents.items():
+        summary[name]["seconds"] = (last_us - first_us) / 1e6
+    return summary
+
+def format_summary(summary, stages=None):
+    """Return a one line summary such as "RI Inventory 4.1s, Merge 0.3s - 52 calls, 2 retries (2 throttled), 1.2 MB" """
+    if stages is None:
+        stages = list(summary)
+    timings = ", ".join(f"{stage} {summary[stage]['seconds']:.1f}s" for stage in stages if stage in summary)
+    calls = sum(summary[stage]["calls"] for stage in summary)
+    retries = sum(summary[stage]["retries"] for stage in summary)
+    throttles = sum(summary[stage]["throttles"] for stage in summary)
+    megabytes = sum(summary[stage]["bytes"] for stage in summary) / 1e6
+    return f"{timings} - {calls} calls, {retries} retries ({throttles} throttled), {megabytes:.1f} MB"
+
+def write_trace(path):
+    """Write the current trace as a Trace Event Format JSON file"""
+    with trace_lock:
+        events = list(trace_events)
+        names = dict(thread_names)
+
+    pid = os.getpid()
+    metadata = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "aws-ri-inventory"}}]
+    metadata += [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+        for tid, name in names.items()
+    ]
+    with open(path, "w") as trace_file:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, trace_file)
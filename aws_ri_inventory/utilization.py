@@ -0,0 +1,255 @@
+"""Daily Reserved Instance utilization history.
+
+Cost Explorer cannot group by subscription and split by day in one request
+(Granularity can't be set together with GroupBy), so every day is its own
+request grouped by subscription, and is stored as a partition of the history
+table next to the snapshots. Later runs only request the days that are
+missing, plus the last few days that Cost Explorer may still revise. Days
+and subscriptions older than the history window are pruned after every
+update. Rollups over any window are computed from the stored history without
+calling Cost Explorer.
+"""
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import pandas as pd
+
+from aws_ri_inventory import progress
+from aws_ri_inventory.clients import iter_pages
+
+# Days of history kept for the longest rollup window
+UTILIZATION_HISTORY_DAYS = 365
+
+# Days requested from Cost Explorer at the same time, one call each
+UTILIZATION_WORKERS = 4
+
+# Cost Explorer can still revise the most recent days, so they are fetched again
+UTILIZATION_SETTLE_DAYS = 3
+
+# Rollup windows in days, shown as Utilization7d, Utilization30d...
+UTILIZATION_WINDOWS = (7, 30, 90, 365)
+
+def connect_history_db(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60)
+    conn.executescript(
+        "CREATE TABLE IF NOT EXISTS utilization_days ("
+        " account_id TEXT NOT NULL,"
+        " day TEXT NOT NULL,"
+        " fetched_at TEXT NOT NULL,"
+        " PRIMARY KEY (account_id, day));"
+        "CREATE TABLE IF NOT EXISTS utilization_history ("
+        " account_id TEXT NOT NULL,"
+        " day TEXT NOT NULL,"
+        " ri_id TEXT NOT NULL,"
+        " purchased_hours REAL,"
+        " actual_hours REAL,"
+        " unused_hours REAL,"
+        " net_ri_savings REAL,"
+        " PRIMARY KEY (account_id, day, ri_id)) WITHOUT ROWID;"
+        "CREATE TABLE IF NOT EXISTS utilization_subscriptions ("
+        " account_id TEXT NOT NULL,"
+        " ri_id TEXT NOT NULL,"
+        " last_day TEXT NOT NULL,"
+        " subscription_status TEXT,"
+        " total_asset_value TEXT,"
+        " start_date_time TEXT,"
+        " end_date_time TEXT,"
+        " PRIMARY KEY (account_id, ri_id));"
+    )
+    return conn
+
+def missing_days(conn, account_id, today=None):
+    """Return the days of the history window that have to be fetched, oldest first"""
+    if today is None:
+        today = datetime.now(timezone.utc).date()
+    first_day = today - timedelta(days=UTILIZATION_HISTORY_DAYS)
+    settled_before = today - timedelta(days=UTILIZATION_SETTLE_DAYS)
+
+    stored = {
+        date.fromisoformat(day)
+        for (day,) in conn.execute(
+            "SELECT day FROM utilization_days WHERE account_id = ? AND day >= ? AND day < ?",
+            (account_id, first_day.isoformat(), settled_before.isoformat())
+        )
+    }
+    days = []
+    day = first_day
+    while day < today:
+        if day not in stored:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+def store_utilization_pages(conn, account_id, day, pages):
+    """Replace the partition of day with the given response pages of a request for [day, day + 1).
+
+    Raises ValueError, without writing anything, if a response covers any
+    other period, since its totals could not be told apart by day. All pages
+    are read before the write transaction starts, so the database is never
+    locked while waiting on Cost Explorer.
+    """
+    day_start = day.isoformat()
+    day_end = (day + timedelta(days=1)).isoformat()
+    history_rows = []
+    subscription_rows = []
+    for page in pages:
+        for utilization_by_time in page["UtilizationsByTime"]:
+            time_period = utilization_by_time["TimePeriod"]
+            if (time_period["Start"][:10], time_period["End"][:10]) != (day_start, day_end):
+                raise ValueError(
+                    f"Utilization for {time_period['Start']} to {time_period['End']} "
+                    f"does not cover exactly the day {day_start}"
+                )
+            for sub in utilization_by_time.get("Groups", []):
+                attributes = sub["Attributes"]
+                utilization = sub["Utilization"]
+                ri_id = attributes["reservationARN"].split("/", 1)[1]
+                history_rows.append((
+                    account_id, day_start, ri_id,
+                    float(utilization.get("PurchasedHours") or 0),
+                    float(utilization.get("TotalActualHours") or 0),
+                    float(utilization.get("UnusedHours") or 0),
+                    float(utilization.get("NetRISavings") or 0),
+                ))
+                subscription_rows.append((
+                    account_id, ri_id, day_start,
+                    attributes.get("subscriptionStatus"),
+                    attributes.get("totalAssetValue"),
+                    attributes.get("startDateTime"),
+                    attributes.get("endDateTime"),
+                ))
+
+    fetched_at = datetime.now(timezone.utc).isoformat()
+    with conn:
+        conn.execute(
+            "DELETE FROM utilization_history WHERE account_id = ? AND day = ?",
+            (account_id, day_start)
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO utilization_history VALUES (?, ?, ?, ?, ?, ?, ?)",
+            history_rows
+        )
+        conn.executemany(
+            "INSERT INTO utilization_subscriptions VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (account_id, ri_id) DO UPDATE SET"
+            " last_day = excluded.last_day,"
+            " subscription_status = excluded.subscription_status,"
+            " total_asset_value = excluded.total_asset_value,"
+            " start_date_time = excluded.start_date_time,"
+            " end_date_time = excluded.end_date_time"
+            " WHERE excluded.last_day >= utilization_subscriptions.last_day",
+            subscription_rows
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO utilization_days VALUES (?, ?, ?)",
+            (account_id, day_start, fetched_at)
+        )
+
+def prune_history(conn, account_id, today=None):
+    """Delete the days, and the subscriptions last seen, before the history window"""
+    if today is None:
+        today = datetime.now(timezone.utc).date()
+    first_day = (today - timedelta(days=UTILIZATION_HISTORY_DAYS)).isoformat()
+    with conn:
+        conn.execute("DELETE FROM utilization_history WHERE account_id = ? AND day < ?", (account_id, first_day))
+        conn.execute("DELETE FROM utilization_days WHERE account_id = ? AND day < ?", (account_id, first_day))
+        conn.execute("DELETE FROM utilization_subscriptions WHERE account_id = ? AND last_day < ?", (account_id, first_day))
+
+def fetch_utilization_day(ce_client, day):
+    """Return the response pages of one day's utilization, grouped by subscription"""
+    return list(iter_pages(
+        ce_client,
+        "get_reservation_utilization",
+        TimePeriod={
+            "Start": day.isoformat(),
+            "End": (day + timedelta(days=1)).isoformat()
+        },
+        GroupBy=[
+            {
+                "Type": "DIMENSION",
+                "Key": "SUBSCRIPTION_ID"
+            }
+        ]
+    ))
+
+def update_utilization_history(ce_client, account_id, path, today=None, max_workers=None):
+    """Fetch every missing day of the account's history and prune what fell out of it.
+
+    Up to max_workers days are requested at a time; each is stored as soon as
+    it arrives. Returns the number of days fetched.
+    """
+    if max_workers is None:
+        max_workers = UTILIZATION_WORKERS
+
+    with closing(connect_history_db(path)) as conn:
+        days = missing_days(conn, account_id, today)
+        if days:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                fetch_day = progress.bind(fetch_utilization_day)
+                for day, pages in zip(days, executor.map(lambda day: fetch_day(ce_client, day), days)):
+                    store_utilization_pages(conn, account_id, day, pages)
+        prune_history(conn, account_id, today)
+    return len(days)
+
+def utilization_rollups(account_id, path, windows=None, today=None):
+    """Return one row per RI with utilization, unused hours and net savings over each window.
+
+    The 30 day window keeps the column names of the single Cost Explorer call
+    this replaces (UtilizationPercentage, UnusedHours, NetRISavings). The other
+    windows add Utilization{N}d and UnusedHours{N}d. RIs last seen before the
+    longest window are left out.
+    """
+    if windows is None:
+        windows = UTILIZATION_WINDOWS
+    if today is None:
+        today = datetime.now(timezone.utc).date()
+
+    with closing(connect_history_db(path)) as conn:
+        df_rollups = pd.read_sql_query(
+            "SELECT ri_id AS ReservedInstancesId,"
+            " subscription_status AS SubscriptionStatus,"
+            " total_asset_value AS TotalAssetValue,"
+            " start_date_time AS StartDateTime,"
+            " end_date_time AS EndDateTime"
+            " FROM utilization_subscriptions WHERE account_id = ? AND last_day >= ?",
+            conn,
+            params=(account_id, (today - timedelta(days=max(windows))).isoformat())
+        ).set_index("ReservedInstancesId")
+
+        for window in windows:
+            df_window = pd.read_sql_query(
+                "SELECT ri_id AS ReservedInstancesId,"
+                " SUM(purchased_hours) AS purchased_hours,"
+                " SUM(actual_hours) AS actual_hours,"
+                " SUM(unused_hours) AS unused_hours,"
+                " SUM(net_ri_savings) AS net_ri_savings"
+                " FROM utilization_history WHERE account_id = ? AND day >= ?"
+                " GROUP BY ri_id",
+                conn,
+                params=(account_id, (today - timedelta(days=window)).isoformat())
+            ).set_index("ReservedInstancesId")
+
+            purchased_hours = df_window["purchased_hours"].where(df_window["purchased_hours"] > 0)
+            utilization = df_window["actual_hours"] / purchased_hours * 100
+            if window == 30:
+                df_rollups["UtilizationPercentage"] = utilization
+                df_rollups["UnusedHours"] = df_window["unused_hours"]
+                df_rollups["NetRISavings"] = df_window["net_ri_savings"]
+            else:
+                df_rollups[f"Utilization{window}d"] = utilization
+                df_rollups[f"UnusedHours{window}d"] = df_window["unused_hours"]
+
+    df_rollups["StartDateTime"] = pd.to_datetime(df_rollups["StartDateTime"], utc=True, errors="coerce")
+    df_rollups["EndDateTime"] = pd.to_datetime(df_rollups["EndDateTime"], utc=True, errors="coerce")
+    return df_rollups.reset_index()
+
+def list_history_accounts(path):
+    with closing(connect_history_db(path)) as conn:
+        return [account_id for (account_id,) in conn.execute("SELECT DISTINCT account_id FROM utilization_days")]
@@ -38,6 +38,10 @@ setup(
     ],
     python_requires=">=3.7",
     install_requires=requirements,
+    extras_require={
+        "parquet": ["pyarrow"],
+        "zstd": ["zstandard"],
+    },
     entry_points={
         "console_scripts": [
             "aws-ri-inventory=aws_ri_inventory:main",
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from aws_ri_inventory.diff import align_rows, diff_inventory, patch_positions, row_index
+
+def inventory(ids):
+    return pd.DataFrame({"ReservedInstancesId": ids, "State": ["active"] * len(ids)})
+
+def test_patch_positions_reuses_the_position_of_a_re_added_ri():
+    df_a = inventory(["ri-1", "ri-2", "ri-3"])
+    df_b = inventory(["ri-1", "ri-2"])
+
+    row_ids = row_index(df_a)
+    live_rows = np.ones(len(row_ids), dtype=bool)
+    for df_old, df_new in ((df_a, df_b), (df_b, df_a)):
+        row_ids, added, removed, _, _ = patch_positions(row_ids, diff_inventory(df_old, df_new))
+        live_rows = np.append(live_rows, np.zeros(len(row_ids) - len(live_rows), dtype=bool))
+        live_rows[added] = True
+        live_rows[removed] = False
+
+    assert row_ids.is_unique
+    assert list(row_ids) == ["ri-1", "ri-2", "ri-3"]
+    assert live_rows.all()
+    assert list(align_rows(df_a, row_ids)["ReservedInstancesId"]) == ["ri-1", "ri-2", "ri-3"]
+
+def test_patch_positions_appends_new_ris():
+    df_a = inventory(["ri-1"])
+    df_b = inventory(["ri-1", "ri-2"])
+
+    row_ids, added, removed, _, _ = patch_positions(row_index(df_a), diff_inventory(df_a, df_b))
+
+    assert list(row_ids) == ["ri-1", "ri-2"]
+    assert list(added) == [1]
+    assert len(removed) == 0
+
+def test_diff_inventory_names_changes_in_wide_frames():
+    df_old = inventory(["ri-1", "ri-2", "ri-3"])
+    for i in range(70):
+        df_old[f"Column{i}"] = 0
+    df_new = df_old.copy()
+    df_new.loc[0, "Column69"] = 1
+    df_new.loc[1, ["Column0", "Column64"]] = 1
+    df_new.loc[2, [f"Column{i}" for i in range(70)]] = 2
+
+    df_changes = diff_inventory(df_old, df_new).set_index("ReservedInstancesId")
+
+    assert df_changes.loc["ri-1", "ChangedColumns"] == "Column69"
+    assert df_changes.loc["ri-2", "ChangedColumns"] == "Column0, Column64"
+    assert df_changes.loc["ri-3", "ChangedColumns"] == ", ".join(f"Column{i}" for i in range(70))
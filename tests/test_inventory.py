@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+import boto3
+from botocore.stub import Stubber
+
+from aws_ri_inventory import inventory
+from aws_ri_inventory.clients import create_client
+
+REGION = "us-east-1"
+
+def ri(ri_id):
+    return {
+        "ReservedInstancesId": ri_id,
+        "InstanceType": "m5.large",
+        "InstanceCount": 1,
+        "Start": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "End": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        "Duration": 31536000,
+        "State": "active",
+        "OfferingClass": "standard",
+        "OfferingType": "All Upfront",
+        "ProductDescription": "Linux/UNIX",
+        "Scope": "Region",
+    }
+
+def stubbed_account_session(ris=None, error_code=None):
+    """Return a session whose RI, listing and utilization clients answer from stubs, and the stubbers"""
+    session = boto3.Session(aws_access_key_id="test", aws_secret_access_key="test", region_name=REGION)
+    ec2_stubber = Stubber(create_client(session, "ec2", REGION))
+    ce_stubber = Stubber(create_client(session, "ce"))
+    if error_code:
+        ec2_stubber.add_client_error("describe_reserved_instances", error_code)
+    else:
+        ec2_stubber.add_response("describe_reserved_instances", {"ReservedInstances": ris})
+    ec2_stubber.add_response("describe_reserved_instances_listings", {"ReservedInstancesListings": []})
+    ce_stubber.add_response("get_reservation_utilization", {"UtilizationsByTime": [{"Groups": []}]})
+    ec2_stubber.activate()
+    ce_stubber.activate()
+    return session, [ec2_stubber, ce_stubber]
+
+def test_multi_account_inventory_keeps_the_accounts_that_answer():
+    sessions = {
+        "111111111111": stubbed_account_session(ris=[ri("ri-1"), ri("ri-2")]),
+        "222222222222": stubbed_account_session(error_code="UnauthorizedOperation"),
+    }
+    assumed = []
+
+    def assume_role(base_session, account_id, role_name):
+        assumed.append((base_session, account_id, role_name))
+        return sessions[account_id][0]
+
+    inventory.fetch_errors.clear()
+    df_inventory = inventory.get_multi_account_inventory(
+        "base", list(sessions), "InventoryRole",
+        regions=[REGION],
+        # A Stubber answers in order, so each account's sources are fetched one at a time
+        calls_per_account=1,
+        assume_role=assume_role,
+        use_snapshots=False
+    )
+
+    for _, stubbers in sessions.values():
+        for stubber in stubbers:
+            stubber.assert_no_pending_responses()
+    assert sorted(assumed) == [("base", account_id, "InventoryRole") for account_id in sorted(sessions)]
+    assert sorted(df_inventory["ReservedInstancesId"]) == ["ri-1", "ri-2"]
+    assert set(df_inventory["AccountId"]) == {"111111111111"}
+    assert [(source, region) for source, region, _ in inventory.fetch_errors] == [
+        ("RI Inventory (222222222222)", REGION)
+    ]
+    assert "UnauthorizedOperation" in inventory.fetch_errors[0][2]
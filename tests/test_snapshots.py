@@ -0,0 +1,48 @@
+import sqlite3
+
+import pandas as pd
+
+from aws_ri_inventory import inventory
+
+def ris():
+    return pd.DataFrame({
+        "ReservedInstancesId": ["ri-1", "ri-2"],
+        "Start": pd.to_datetime(["2025-01-01T10:00:00Z", "2025-02-01T00:00:00Z"], utc=True),
+        "InstanceType": ["m5.large", "c5.xlarge"],
+    })
+
+def test_snapshots_round_trip(tmp_path):
+    path = str(tmp_path / "snapshots.sqlite3")
+    fetched_at = inventory.save_snapshot("111111111111", "RI Inventory", "us-east-1", ris(), path)
+
+    snapshots = inventory.load_snapshots("111111111111", path)
+
+    loaded_at, df_loaded = snapshots[("RI Inventory", "us-east-1")]
+    assert loaded_at == fetched_at
+    pd.testing.assert_frame_equal(df_loaded, ris(), check_dtype=False)
+    assert str(df_loaded["Start"].dt.tz) == "UTC"
+
+def test_unreadable_snapshot_is_stale(tmp_path):
+    path = str(tmp_path / "snapshots.sqlite3")
+    inventory.save_snapshot("111111111111", "RI Inventory", "us-east-1", ris(), path)
+    inventory.save_snapshot("111111111111", "RI Listings", "us-east-1", ris(), path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE snapshots SET data = ? WHERE source = 'RI Listings'", (b"\x80\x05not json",))
+
+    snapshots = inventory.load_snapshots("111111111111", path)
+
+    assert list(snapshots) == [("RI Inventory", "us-east-1")]
+    assert not inventory.is_snapshot_fresh(snapshots, "RI Listings", "us-east-1")
+
+def test_last_inventory_is_kept_per_accounts(tmp_path):
+    path = str(tmp_path / "snapshots.sqlite3")
+    source, region = inventory.LAST_INVENTORY_SNAPSHOT
+    df_a = ris().iloc[:1]
+    df_b = ris().iloc[1:]
+    inventory.save_snapshot(inventory.inventory_snapshot_account(["2", "1"]), source, region, df_a, path)
+    inventory.save_snapshot(inventory.inventory_snapshot_account(["3"]), source, region, df_b, path)
+
+    assert list(inventory.load_last_inventory(["1", "2"], path)[1]["ReservedInstancesId"]) == ["ri-1"]
+    assert list(inventory.load_last_inventory(["3"], path)[1]["ReservedInstancesId"]) == ["ri-2"]
+    assert list(inventory.load_last_inventory(None, path)[1]["ReservedInstancesId"]) == ["ri-2"]
+    assert inventory.load_last_inventory(["4"], path) is None
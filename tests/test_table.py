@@ -0,0 +1,23 @@
+import numpy as np
+
+from aws_ri_inventory.table import build_search_index, refine_search, state_positions
+
+def test_refine_search_narrows_and_widens_again():
+    search_index = build_search_index([("m5.large", "active"), ("m5.xlarge", "retired"), ("c5.large", "active")])
+    all_positions = np.arange(len(search_index))
+
+    m5 = refine_search(search_index, all_positions, "", all_positions, "m5")
+    m5_x = refine_search(search_index, all_positions, "m5", m5, "m5.x")
+    c5 = refine_search(search_index, all_positions, "m5.x", m5_x, "c5")
+
+    assert list(m5) == [0, 1]
+    assert list(m5_x) == [1]
+    assert list(c5) == [2]
+    assert list(refine_search(search_index, all_positions, "c5", c5, "")) == [0, 1, 2]
+
+def test_state_positions():
+    state_masks = {"active": np.array([True, False, True])}
+    positions = np.array([0, 1, 2])
+
+    assert list(state_positions(positions, state_masks, "active")) == [0, 2]
+    assert list(state_positions(positions, state_masks, "All")) == [0, 1, 2]
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+import botocore.exceptions
+
+from aws_ri_inventory.throttling import CONNECTION_MAX_ATTEMPTS, MAX_ATTEMPTS, max_attempts
+
+def response(status_code, code=None):
+    parsed = {"Error": {"Code": code}} if code else {}
+    return SimpleNamespace(status_code=status_code), parsed
+
+def test_throttling_and_server_errors_get_every_attempt():
+    assert max_attempts(response(400, "RequestLimitExceeded"), None) == MAX_ATTEMPTS
+    assert max_attempts(response(503), None) == MAX_ATTEMPTS
+    assert max_attempts(response(400, "RequestTimeout"), None) == MAX_ATTEMPTS
+    assert max_attempts(None, botocore.exceptions.ReadTimeoutError(endpoint_url="https://ec2")) == MAX_ATTEMPTS
+
+def test_unreachable_endpoints_get_a_few_attempts():
+    errors = [
+        botocore.exceptions.EndpointConnectionError(endpoint_url="https://ec2"),
+        botocore.exceptions.ConnectTimeoutError(endpoint_url="https://ec2"),
+        botocore.exceptions.SSLError(endpoint_url="https://ec2", error="bad certificate"),
+    ]
+    for error in errors:
+        assert max_attempts(None, error) == CONNECTION_MAX_ATTEMPTS
+
+def test_other_failures_and_successes_are_not_retried():
+    assert max_attempts(response(200), None) == 1
+    assert max_attempts(response(400, "InvalidParameterValue"), None) == 1
+    assert max_attempts(None, ValueError("bad")) == 1
@@ -0,0 +1,130 @@
+from contextlib import closing
+from datetime import date, timedelta
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from aws_ri_inventory import utilization
+
+TODAY = date(2025, 6, 30)
+
+def group(ri_id, actual_hours, purchased_hours=24.0):
+    return {
+        "Attributes": {
+            "reservationARN": f"arn:aws:ec2:us-east-1:111111111111:reserved-instances/{ri_id}",
+            "subscriptionStatus": "Active",
+            "totalAssetValue": "1000.00",
+            "startDateTime": "2025-01-01T00:00:00.000Z",
+            "endDateTime": "2026-01-01T00:00:00.000Z",
+        },
+        "Utilization": {
+            "PurchasedHours": str(purchased_hours),
+            "TotalActualHours": str(actual_hours),
+            "UnusedHours": str(purchased_hours - actual_hours),
+            "NetRISavings": "1.00",
+        },
+    }
+
+def day_page(day, groups, end=None):
+    end = end or day + timedelta(days=1)
+    return {"UtilizationsByTime": [{"TimePeriod": {"Start": day.isoformat(), "End": end.isoformat()}, "Groups": groups}]}
+
+def stored_days(conn):
+    return [date.fromisoformat(day) for (day,) in conn.execute("SELECT day FROM utilization_days ORDER BY day")]
+
+def test_missing_days_skip_settled_stored_days(tmp_path):
+    with closing(utilization.connect_history_db(str(tmp_path / "history.sqlite3"))) as conn:
+        first_day = TODAY - timedelta(days=utilization.UTILIZATION_HISTORY_DAYS)
+        assert utilization.missing_days(conn, "111111111111", TODAY)[0] == first_day
+        assert len(utilization.missing_days(conn, "111111111111", TODAY)) == utilization.UTILIZATION_HISTORY_DAYS
+
+        day = first_day
+        while day < TODAY:
+            utilization.store_utilization_pages(conn, "111111111111", day, [day_page(day, [])])
+            day += timedelta(days=1)
+
+        # The last days may still be revised, so they are fetched again
+        settled_before = TODAY - timedelta(days=utilization.UTILIZATION_SETTLE_DAYS)
+        assert utilization.missing_days(conn, "111111111111", TODAY) == [
+            settled_before + timedelta(days=i) for i in range(utilization.UTILIZATION_SETTLE_DAYS)
+        ]
+        assert len(utilization.missing_days(conn, "222222222222", TODAY)) == utilization.UTILIZATION_HISTORY_DAYS
+
+def test_store_rejects_periods_other_than_the_day(tmp_path):
+    day = TODAY - timedelta(days=10)
+    with closing(utilization.connect_history_db(str(tmp_path / "history.sqlite3"))) as conn:
+        utilization.store_utilization_pages(conn, "111111111111", day, [day_page(day, [group("ri-1", 12.0)])])
+        assert stored_days(conn) == [day]
+
+        # A total over several days must not be stored as the first of them
+        with pytest.raises(ValueError):
+            utilization.store_utilization_pages(
+                conn, "111111111111", day + timedelta(days=1),
+                [day_page(day + timedelta(days=1), [group("ri-1", 1.0)], end=day + timedelta(days=30))]
+            )
+        assert stored_days(conn) == [day]
+        assert conn.execute("SELECT COUNT(*) FROM utilization_history").fetchone() == (1,)
+
+def test_rollup_windows_include_their_first_day(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    with closing(utilization.connect_history_db(path)) as conn:
+        # The 7 day window starts on TODAY - 7; the day before only counts in longer windows
+        for days_ago, actual_hours in ((1, 24.0), (7, 12.0), (8, 0.0)):
+            day = TODAY - timedelta(days=days_ago)
+            utilization.store_utilization_pages(conn, "111111111111", day, [day_page(day, [group("ri-1", actual_hours)])])
+
+    df_rollups = utilization.utilization_rollups("111111111111", path, windows=(7, 30), today=TODAY).set_index("ReservedInstancesId")
+
+    assert df_rollups.loc["ri-1", "Utilization7d"] == pytest.approx(75.0)
+    assert df_rollups.loc["ri-1", "UnusedHours7d"] == pytest.approx(12.0)
+    assert df_rollups.loc["ri-1", "UtilizationPercentage"] == pytest.approx(50.0)
+    assert df_rollups.loc["ri-1", "UnusedHours"] == pytest.approx(36.0)
+
+def test_rollups_leave_out_ris_last_seen_before_the_longest_window(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    with closing(utilization.connect_history_db(path)) as conn:
+        for ri_id, days_ago in (("ri-1", 1), ("ri-2", 31)):
+            day = TODAY - timedelta(days=days_ago)
+            utilization.store_utilization_pages(conn, "111111111111", day, [day_page(day, [group(ri_id, 24.0)])])
+
+    df_rollups = utilization.utilization_rollups("111111111111", path, windows=(7, 30), today=TODAY)
+
+    assert list(df_rollups["ReservedInstancesId"]) == ["ri-1"]
+
+def test_update_requests_one_grouped_day_at_a_time_and_prunes(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    first_day = TODAY - timedelta(days=utilization.UTILIZATION_HISTORY_DAYS)
+    gap = TODAY - timedelta(days=20)
+    with closing(utilization.connect_history_db(path)) as conn:
+        utilization.store_utilization_pages(conn, "111111111111", first_day - timedelta(days=1),
+                                            [day_page(first_day - timedelta(days=1), [group("ri-old", 24.0)])])
+        day = first_day
+        while day < TODAY:
+            if day != gap:
+                utilization.store_utilization_pages(conn, "111111111111", day, [day_page(day, [])])
+            day += timedelta(days=1)
+
+    ce_client = boto3.client("ce", region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test")
+    stubber = Stubber(ce_client)
+    days = [gap] + [TODAY - timedelta(days=days_ago) for days_ago in range(utilization.UTILIZATION_SETTLE_DAYS, 0, -1)]
+    for day in days:
+        stubber.add_response(
+            "get_reservation_utilization",
+            day_page(day, [group("ri-1", 24.0)]),
+            {
+                "TimePeriod": {"Start": day.isoformat(), "End": (day + timedelta(days=1)).isoformat()},
+                "GroupBy": [{"Type": "DIMENSION", "Key": "SUBSCRIPTION_ID"}],
+            }
+        )
+
+    with stubber:
+        fetched = utilization.update_utilization_history(ce_client, "111111111111", path, today=TODAY, max_workers=1)
+    stubber.assert_no_pending_responses()
+
+    assert fetched == len(days)
+    with closing(utilization.connect_history_db(path)) as conn:
+        assert stored_days(conn)[0] == first_day
+        assert len(stored_days(conn)) == utilization.UTILIZATION_HISTORY_DAYS
+        assert conn.execute("SELECT ri_id FROM utilization_subscriptions").fetchall() == [("ri-1",)]
+        assert conn.execute("SELECT COUNT(*) FROM utilization_history WHERE ri_id = 'ri-old'").fetchone() == (0,)